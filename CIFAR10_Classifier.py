@@ -83,6 +83,29 @@ from sklearn.decomposition import PCA, NMF
 from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
 from sklearn.preprocessing import StandardScaler, minmax_scale
 from sklearn.metrics import mean_squared_error, accuracy_score, recall_score,     precision_score, confusion_matrix, roc_auc_score, roc_curve
+###############################################################################
+# Shared loaders, pipelines, preprocessing and models
+###############################################################################
+from vehicle_classification.config import SEED, NUM_CLASSES, INPUT_SHAPE, \
+    VEHICLE_CLASSES, CLASS_NAMES
+from vehicle_classification.data import cifar10_subset_cached, split_indices
+from vehicle_classification.pipeline import make_dataset
+from vehicle_classification.preprocessing import MinMaxImageScaler, \
+    SCALER_LAYER_NAME, my_minmax
+from vehicle_classification.models import input_layers, build_base_model, \
+    build_model
+from vehicle_classification.hyperband import CarTruckCNN, PrunedHyperband
+from vehicle_classification.training import fit_resumable, run_config
+from vehicle_classification.decomposition import fit_streaming_pca, \
+    n_components_for_variance, fit_nmf, benchmark_nmf
+from vehicle_classification.transform_cache import TransformCache, \
+    data_fingerprint
+from vehicle_classification.classical import FusedLDA
+from vehicle_classification.metrics import ConfusionMatrix, get_metrics, \
+    get_acc_from_conf, METRIC_NAMES
+from vehicle_classification.evaluation import evaluate_models
+from vehicle_classification.interpretability import extract_activations, \
+    write_activations
 
 
 # #### Helper Functions
@@ -91,164 +114,18 @@ from sklearn.metrics import mean_squared_error, accuracy_score, recall_score,
 
 
 ###############################################################################
-# Load CIFAR10 Cars and Trucks
-###############################################################################
-def cifar10_cars_trucks():
-    (X_train, y_train), (X_test, y_test) = keras.datasets.cifar10.load_data()
-    cars0 = 1; trucks1 = 9
-
-    train_ind = np.where((y_train == cars0) | (y_train == trucks1))[0]
-    test_ind = np.where((y_test == cars0) | (y_test == trucks1))[0]
-    
-    y_train = y_train[train_ind]
-    X_train = X_train[train_ind]
-    y_test = y_test[test_ind]
-    X_test = X_test[test_ind]
-
-    # Relabel car0 as 0 and truck1 as 1
-    y_train[y_train == cars0] = 0
-    y_train[y_train == trucks1] = 1
-    y_test[y_test == cars0] = 0
-    y_test[y_test == trucks1] = 1
-    return( (X_train, y_train), (X_test, y_test) )
-
-###############################################################################
-# Min-Max Scaling
-###############################################################################
-def my_minmax(x):
-    return( (x - np.min(x) / (np.max(x) - np.min(x))) )
-
-###############################################################################
-# Plot Image
-###############################################################################
-def plot_image(X: np.ndarray, idx: int=0):
-    plt.imshow(X[idx].reshape(32, 32, 3));
-
-###############################################################################
-# Flattens tensor image for PCA and NMF processing
-###############################################################################
-def my_flattener(x):
-    cnt, h, w, d = x.shape
-    return x.reshape(cnt, h*w*d)
-
-###############################################################################
-# Dataclass for Processing Results
-###############################################################################
-@dataclass
-class ClassifierResults:
-  name: str
-  y_true: np.ndarray = field(repr=False)
-  preds: np.ndarray = field(repr=False)
-  probs: np.ndarray = field(repr=False)
-
-  def __repr__(self) -> None:
-    rtn = f"Results for {self.name}\n" +           f"Accuracy:\t {self.accuracy()}\n"
-    return(rtn)
-
-  def accuracy(self) -> float:
-    return (accuracy_score(self.y_true, self.preds))
-
-###############################################################################
-# Make Predictions
-###############################################################################
-def make_predictions(label, model, X_fitted, y_true):
-  results = ClassifierResults(
-      name = label,
-      y_true = y_true,
-      preds = model.predict(X_fitted),
-      probs = model.predict_proba(X_fitted)
-  )
-  return (results)
-
-###############################################################################
-# Plot Feature Map
-###############################################################################
-def plot_feature_map(layer=0, n_col=8, n_row=4):
-    plt.figure(figsize=(n_col, n_row))
-    for j in range(n_row * n_col):
-        plt.subplot(n_row, n_col, j + 1)
-        plt.imshow(outputs[layer][0, :, :, j])
-        plt.xticks(())
-        plt.yticks(())
-    plt.show;
-
-###############################################################################
-# Plot Image Map
-###############################################################################
-def plot_image_matrix(mod, n_col=10, n_row=10):
-    plt.figure(figsize=(n_col, n_row)) 
-    for j in range(n_col*n_row):
-        plt.subplot(n_col, n_row, j + 1) 
-        plt.imshow(mod[j].reshape(32, 32, 3)) 
-        plt.xticks(())
-        plt.yticks(())
-
-###############################################################################
-# Plot Model Results (loss) from History
-###############################################################################
-def plot_model_results(history):
-    plt.plot(history.history['loss'])
-    plt.plot(history.history['val_loss'])
-    plt.title('model loss')
-    plt.ylabel('loss')
-    plt.xlabel('epoch')
-    plt.legend(['train', 'val'], loc='upper right')
-    plt.show();
-
-###############################################################################
-# Plot Model Accuracy from History
-###############################################################################
-def plot_model_accuracy(history):
-    plt.plot(history.history['accuracy'], label='train')
-    plt.plot(history.history['val_accuracy'], label='val')
-    plt.title('model accuracy')
-    plt.ylabel('accuracy')
-    plt.xlabel('epoch')
-    plt.legend(['train', 'val'], loc='upper right')
-    plt.ylim([0.5, 1])
-    plt.legend(loc='lower right')
-    plt.show();
-
-###############################################################################
-# Plot PCA Scree Plot
-###############################################################################
-def plt_pca_scree_plot(pca_mod: PCA):
-    fig, ax = plt.subplots(1,2)
-    fig.suptitle("Scree Plot")
-    fig.set_size_inches(10, 5)
-    fig.set_dpi(80)
-    fig.tight_layout(pad=5.0)
-    ax[0].plot(pca_mod.explained_variance_ratio_)
-    ax[0].set_xlabel('number of components')
-    ax[0].set_ylabel('ratio explained variance')
-    ax[0].set_title("Ratio")
-    ax[1].plot(np.cumsum(pca_mod.explained_variance_ratio_))
-    ax[1].set_xlabel('number of components')
-    ax[1].set_ylabel('cumulative explained variance')
-    ax[1].set_title("Cumulative Sum ")
-    fig.show();
-
-###############################################################################
-# Measure accuracy, recall, precision, fpr, fdr
-###############################################################################
-def get_metrics(y_true, y_preds):
-    tn, fp, fn, tp = confusion_matrix(y_true, y_preds).ravel()
-    accuracy = accuracy_score(y_true, y_preds)
-    recall = recall_score(y_true, y_preds)
-    precision = precision_score(y_true, y_preds)
-    roc = roc_curve(y_true,y_preds)
-    fpr = fp / (fp + tn)
-    fdr = fp / (fp + tp)
-    return (accuracy, recall, precision, fpr, fdr)
-
-###############################################################################
-# Return Accuracy from Confusion Matrix
+# Plotting, results, flattening and TFLite helpers live in the package:
+#   vehicle_classification/plotting.py, results.py, preprocessing.py, export.py
 ###############################################################################
-def get_acc_from_conf(conf_mtx):
-    acc = sum(conf_mtx.diagonal())/2000
-    t_acc = conf_mtx.diagonal()[0]/1000
-    c_acc = conf_mtx.diagonal()[1]/1000
-    return acc, t_acc, c_acc
+from vehicle_classification.plotting import plot_image, plot_feature_map, \
+    plot_image_matrix, plot_model_results, plot_model_accuracy, \
+    plt_pca_scree_plot
+from vehicle_classification.results import ClassifierResults, \
+    make_predictions, ResultsStore
+from vehicle_classification.preprocessing import my_flattener
+from vehicle_classification.export import TFLITE_QUANTIZE, export_tflite, \
+    tflite_predict, compare_tflite
+from vehicle_classification.serving import save_class_names
 
 
 # ### Exploratory Data Analysis (EDA)
@@ -261,16 +138,18 @@ def get_acc_from_conf(conf_mtx):
 
 
 ###############################################################################
-# Load data into training and test
+# Load data into training and test (memory-mapped from the local cache)
+# VEHICLE_CLASSES (config.py) lists the CIFAR-10 labels kept, car and truck
+# by default
 # Print Dimensions
 ###############################################################################
-(X_train, y_train), (X_test, y_test) = cifar10_cars_trucks()
+(X_train, y_train), (X_test, y_test) = cifar10_subset_cached(VEHICLE_CLASSES)
 print(f"Dataset Dimensions:")
 print(f"Train: X={X_train.shape}\ty={y_train.shape}")
 print(f"Test : X={X_test.shape }\ty={y_test.shape}")
 
 
-# **NOTE**:  The training set has 10,000 images of which 2,000 will be used as a validation set.  This will be done by setting validation_split=0.2.
+# **NOTE**:  The training set has 10,000 images of which 2,000 will be used as a validation set.  The split is stratified by class, computed once by split_indices(validation_split=0.2) and stored beside the cached dataset, so every model and the tuner validate on the same images.
 
 # In[ ]:
 
@@ -292,19 +171,24 @@ fig.show();
 
 ###############################################################################
 # PCA Analysis
-###############################################################################
-X_train_pca = my_flattener(X_train.copy())
-X_test_pca = my_flattener(X_test.copy())
-
-scaler = StandardScaler()
-X_train_pca = scaler.fit_transform(X_train_pca)
-scaler.transform(X_test_pca)
+# Fitted stages and projections are loaded from the transform cache when the
+# data and hyperparameters are unchanged (see artifacts/).  The LDA-PCA
+# model below projects through the same scaler and PCA itself, so no
+# projected copies of the data are kept here.
+###############################################################################
+transform_cache = TransformCache(Path("artifacts"), max_bytes=2 << 30)
+train_key = data_fingerprint(X_train)
+
+scaler, scaler_key = transform_cache.fit(
+    "standard_scaler", StandardScaler(), my_flattener(X_train), data_key=train_key)
+X_train_scaled, train_scaled_key = transform_cache.transform(
+    scaler, scaler_key, my_flattener(X_train), data_key=train_key)
 # test validate mean == 0 and std == 1
-assert np.isclose(0, X_train_pca.mean()) & np.isclose(1, X_train_pca.std())
+assert np.isclose(0, X_train_scaled.mean()) & np.isclose(1, X_train_scaled.std())
 
-pca = PCA(n_components=180, random_state=1842)
-X_train_pca = pca.fit_transform(X_train_pca)
-X_test_pca = pca.transform(X_test_pca)
+pca, pca_key = transform_cache.fit(
+    "pca", PCA(n_components=180, random_state=1842), X_train_scaled,
+    data_key=train_scaled_key)
 
 plt_pca_scree_plot(pca)
 
@@ -317,6 +201,26 @@ plt_pca_scree_plot(pca)
 ###############################################################################
 expl_diff = np.round(np.sum(pca.explained_variance_ratio_)*100, 2)
 print(f"Top 180 components explain {expl_diff}% of the variance.")
+print(f"Components needed for 90% of the variance: "
+      f"{n_components_for_variance(pca, 0.9)}")
+
+
+# In[ ]:
+
+
+###############################################################################
+# PCA Analysis | Out-of-core
+# Same analysis streamed in chunks from the memory-mapped cache with
+# IncrementalPCA.  Only the component matrix is held in memory, so this
+# scales to camera captures far larger than CIFAR.
+###############################################################################
+ipca_scaler, ipca = fit_streaming_pca(X_train, n_components=180, chunk_size=2000)
+
+plt_pca_scree_plot(ipca)
+print(f"IncrementalPCA | Top 180 components explain "
+      f"{np.round(np.sum(ipca.explained_variance_ratio_)*100, 2)}% of the variance.")
+print(f"IncrementalPCA | Components needed for 90% of the variance: "
+      f"{n_components_for_variance(ipca, 0.9)}")
 
 
 # In[ ]:
@@ -337,21 +241,17 @@ plot_image_matrix(pca_loadings)
 
 ###############################################################################
 # LDA-PCA Model 
+# FusedLDA projects with the fitted StandardScaler + PCA (scaled and centred,
+# as PCA.transform does), fits the LDA, then folds all three stages into one
+# float32 matrix.  Scoring runs on the raw uint8 images in chunks.
 ###############################################################################
 # set seed & create classifier
 np.random.seed(1842)
-lda_pca = LDA()
-
-# tranform training and test
-X_train_pca = np.dot(my_flattener(X_train), pca.components_.T)
-X_test_pca = np.dot(my_flattener(X_test), pca.components_.T)
-
-# fit model
-lda_pca_fitted = lda_pca.fit(X_train_pca, y_train.reshape(10000))
+lda_pca_fitted = FusedLDA(pca, scaler=scaler).fit(X_train, y_train)
 
 ## make predictions
-train_pca_res = make_predictions("LDA-PCA | Train", lda_pca_fitted, X_train_pca, y_train)
-test_pca_res = make_predictions("LDA-PCA | Test", lda_pca_fitted, X_test_pca, y_test)
+train_pca_res = make_predictions("LDA-PCA | Train", lda_pca_fitted, X_train, y_train)
+test_pca_res = make_predictions("LDA-PCA | Test", lda_pca_fitted, X_test, y_test)
 
 # print results
 print(train_pca_res)
@@ -373,10 +273,11 @@ print(tabulate(confusion_matrix(test_pca_res.y_true, test_pca_res.preds), tablef
 # NMF Tranformation 
 ###############################################################################
 X_train_nmf = my_flattener(X_train)
-X_test_nmf = my_flattener(X_test)
 
-nmf = NMF(n_components=100, random_state=1842, init='random', 
-          max_iter=500, tol=5e-3).fit(X_train_nmf)
+# refit only when the data or hyperparameters change
+nmf, nmf_key = transform_cache.fit(
+    "nmf", NMF(n_components=100, random_state=1842, init='random', 
+               max_iter=500, tol=5e-3), X_train_nmf, data_key=train_key)
           
 # nmf_W = nmf.fit_transform(X_train_nmf)
 nmf_H = nmf.components_
@@ -393,6 +294,33 @@ nmf_loadings = minmax_scale(nmf.components_, feature_range=(0,1), axis=1)
 plot_image_matrix(nmf_loadings)
 
 
+# In[ ]:
+
+
+###############################################################################
+# NMF Engine Comparison
+# Time for each engine to reach the reconstruction error of the current
+# configuration (coordinate descent, random init, float64).
+###############################################################################
+nmf_engines = {
+    "cd | random | float64 (current)": dict(backend="cd", init="random",
+                                            dtype=np.float64),
+    "cd | nndsvda | float32": dict(backend="cd", init="nndsvda"),
+    "mu | nndsvda | float32": dict(backend="mu", init="nndsvda"),
+    "minibatch | nndsvda | float32": dict(backend="minibatch", init="nndsvda"),
+}
+nmf_bench = benchmark_nmf(X_train_nmf, nmf_engines,
+                          target_err=nmf.reconstruction_err_,
+                          n_components=100, tol=5e-3)
+print(tabulate(nmf_bench, tablefmt='grid',
+               headers=["Engine", "Secs to target", "Total secs",
+                        "Iterations", "Final error"]))
+
+# Nightly refresh on new captures: warm start from the saved loadings
+# nmf_refreshed = fit_nmf(X_new_nmf, backend="minibatch",
+#                         warm_start=nmf.components_, max_iter=50)
+
+
 # #### EDA | LDA-NMF Model
 # > Using the NMF loadings, create an LDA model to test predictive capabilities of reduced data.
 # 
@@ -402,16 +330,18 @@ plot_image_matrix(nmf_loadings)
 
 ###############################################################################
 # LDA-NMF Model for EDA
+# Images are projected onto the NMF loadings (X @ H.T) and fused with the
+# LDA into one float32 matrix, as for LDA-PCA.
 ###############################################################################
-# tranform training and test set of X
-X_train_nmf = np.dot(my_flattener(X_train), nmf_H.T)
-X_test_nmf = np.dot(my_flattener(X_test), nmf_H.T)
+lda_nmf_fitted = FusedLDA(nmf).fit(X_train, y_train)
 
-lda_nmf = LDA()
-lda_nmf_fitted = lda_nmf.fit(X_train_nmf, y_train.reshape(10000))
+train_nmf_res =     make_predictions("LDA-NMF | Train", lda_nmf_fitted, X_train, y_train)
+test_nmf_res =     make_predictions("LDA-NMF | Test", lda_nmf_fitted, X_test, y_test)
 
-train_nmf_res =     make_predictions("LDA-NMF | Train", lda_nmf_fitted, X_train_nmf, y_train)
-test_nmf_res =     make_predictions("LDA-NMF | Test", lda_nmf_fitted, X_test_nmf, y_test)
+# saved fused classifiers serve as a CPU fallback:
+#   joblib.dump(lda_pca_fitted, MODEL_DIR / "lda_pca.joblib")
+#   save_class_names(MODEL_DIR / "lda_pca.joblib", VEHICLE_CLASSES)
+#   python -m vehicle_classification serve --model models/lda_pca.joblib
 
 print(train_nmf_res)
 print(test_nmf_res)
@@ -424,6 +354,22 @@ print(
 
 # **NOTE:** Performance of NMF model is approxiamately the same as the PCA model at 71%. 
 
+# In[ ]:
+
+
+###############################################################################
+# Store EDA results (results/index.jsonl + one compact .npz per run) and
+# compare them with earlier runs without loading their predictions
+###############################################################################
+results_store = ResultsStore(Path("results"))
+for res, split in ((train_pca_res, "train"), (test_pca_res, "test"),
+                   (train_nmf_res, "train"), (test_nmf_res, "test")):
+    results_store.add(res, split=split)
+
+print(tabulate(results_store.compare(results_store.runs(split="test")),
+               headers=["Run", "Model", *METRIC_NAMES], tablefmt='grid'))
+
+
 # ##### EDA Summary / Conclusions
 # The exploratory data analysis (EDA) showed the image prediction at 71% could be achieved using an LDA model along with dimension reduction technqiues such as PCA and NMF.  More specically, the PCA analysis showed that with 180 components that greater than 90% of the variance could be explained.  This insight will be useful in determining the initial design of the convolutional neural network (CNN) model.
 
@@ -436,19 +382,17 @@ print(
 
 
 ###############################################################################
-# CNN Modeling Preprocessing
+# CNN Modeling Input Pipelines
+# X stays uint8; float conversion and one-hot encoding happen per batch.
+# Per-channel min/max are computed once on the training split and fused
+# into each model as its first layer.
 ###############################################################################
-def preprocess_x(x: np.ndarray) -> np.ndarray:
-    x = x.astype("float32")
-    x = my_minmax(x)
-    x = x.reshape(-1, 32, 32, 3)
-    return(x)
+fit_idx, val_idx = split_indices(validation_split=0.2)
+cnn_scaler = MinMaxImageScaler(per_channel=True).fit(X_train, indices=fit_idx)
 
-def preprocess_y(y: np.ndarray) -> np.ndarray:
-    return(np_utils.to_categorical(y))
-
-X_train, X_test = [preprocess_x(X) for X in [X_train, X_test]]
-y_train, y_test = [preprocess_y(y) for y in [y_train, y_test]]
+train_ds = make_dataset(X_train, y_train, indices=fit_idx, shuffle=True, seed=SEED)
+val_ds = make_dataset(X_train, y_train, indices=val_idx)
+test_ds = make_dataset(X_test, y_test)
 
 
 # ##### Modeling | CNN | Model Prototype
@@ -458,55 +402,28 @@ y_train, y_test = [preprocess_y(y) for y in [y_train, y_test]]
 
 ###############################################################################
 # CNN Hypermodel Prototype
+# CarTruckCNN lives in vehicle_classification/hyperband.py so that the parallel
+# tuner (python -m vehicle_classification.tuning) can import it.
 ###############################################################################
-class CarTruckCNN(HyperModel):
-    def __init__(self, input_shape, num_classes):
-        self.input_shape = input_shape
-        self.num_classes = num_classes
-
-    def build(self, hp):
-        model = Sequential()
-        model.add(
-            Conv2D(32, (3,3), activation="relu", input_shape=X_train.shape[1:]))
-        model.add(MaxPool2D(pool_size=(2,2)))
-        model.add(Dropout(rate=hp.Float(
-            'dropout_1', min_value=0.0, max_value=0.5,default=0.25,step=0.05,)))
-        model.add(Dropout(rate=0.05))
-        model.add(Conv2D(32, (3,3)))
-        model.add(MaxPool2D(pool_size=(2,2)))
-        model.add(Dropout(rate=hp.Float(
-            'dropout_2',min_value=0.0,max_value=0.5,default=0.25,step=0.05,)))
-        model.add(Flatten())
-        model.add(keras.layers.Dense(
-            hp.Choice('units_1', [2048, 1024]), activation='relu'))
-        model.add(Dense(hp.Choice('units_2', [512, 256]), activation="relu"))
-        model.add(Dense(hp.Choice('units_3', [256, 128]), activation="relu"))
-        model.add(Dense(2, activation="softmax"))
-
-        model.compile(
-            optimizer="adam", 
-            loss="categorical_crossentropy", 
-            metrics=["accuracy"])
-        return(model)
 
 ###############################################################################
 # CNN Hypermodel Prototype | Settings
 ###############################################################################
-hband_dir = Path("/content/drive/MyDrive/Colab Notebooks/hyperband")
-INPUT_SHAPE = X_train.shape[1:]
-NUM_CLASSES = 2
+hband_dir = Path("hyperband")
 HYPERBAND_MAX_EPOCHS = 30
-SEED = 1842
 EXECUTION_PER_TRIAL = 5
 
 ###############################################################################
 # CNN Hypermodel Prototype | Tuning
 ###############################################################################
-card_truck_hypermodel =     CarTruckCNN(input_shape=INPUT_SHAPE, num_classes=NUM_CLASSES)
-tuner = Hyperband(
+card_truck_hypermodel =     CarTruckCNN(input_shape=INPUT_SHAPE, num_classes=NUM_CLASSES,
+                scaler=cnn_scaler)
+tuner = PrunedHyperband(
     card_truck_hypermodel,
+    min_executions=2,
+    prune_margin=0.02,
     max_epochs=HYPERBAND_MAX_EPOCHS,
-    objective='accuracy',
+    objective='val_accuracy',
     seed=SEED,
     executions_per_trial=EXECUTION_PER_TRIAL,
     directory=hband_dir,
@@ -521,9 +438,11 @@ tuner.search_space_summary()
 ###############################################################################
 # This code block is commented out on purpose, as it take about 2 1/2 hours
 # to complete. However, the results of the search are outlined below.  
+# To run the search in parallel (and resume it after an interruption) use:
+#   python -m vehicle_classification.tuning --workers 4 --directory hyperband
 ###############################################################################
 
-# tuner.search(X_train, y_train, epochs=2, validation_split=0.2)
+# tuner.search(train_ds, epochs=2, validation_data=val_ds)
 
 ###############################################################################
 # Best accuracy So Far: 0.9816499948501587
@@ -531,7 +450,7 @@ tuner.search_space_summary()
 ###############################################################################
 
 # best_model = tuner.get_best_models(num_models=1)[0]
-# best_model.evaluate(X_test, y_test)
+# best_model.evaluate(test_ds)
 
 ###############################################################################
 # loss: 0.5597 - accuracy: 0.8515
@@ -549,22 +468,11 @@ tuner.search_space_summary()
 
 ###############################################################################
 # CNN Base Model
+# build_base_model / build_model live in vehicle_classification/models.py.
+# Pass fast=True for XLA, steps_per_execution and mixed bfloat16 training
+# (python -m vehicle_classification.benchmarks fast-training compares both).
 ###############################################################################
-def build_base_model():
-    model = Sequential()
-    model.add(Conv2D(32, (3,3), activation="relu", 
-                     input_shape=X_train.shape[1:]))
-    model.add(MaxPool2D(pool_size=(2,2)))
-    model.add(Flatten())
-    model.add(Dense(units=2, activation="sigmoid"))
-
-    model.compile(
-        optimizer="adam", 
-        loss="binary_crossentropy", 
-        metrics=["accuracy"])
-    return(model)
-
-car_truck_model_base = build_base_model()
+car_truck_model_base = build_base_model(cnn_scaler)
 car_truck_model_base.summary()
 
 
@@ -575,15 +483,13 @@ car_truck_model_base.summary()
 # CNN Base Model | Fit and Evaluate Resutls
 ###############################################################################
 base_model_hist_base = car_truck_model_base.fit(
-    x=X_train, 
-    y=y_train, 
+    train_ds, 
     epochs=100, 
     verbose="auto", 
-    use_multiprocessing=True, 
-    validation_split=0.2
+    validation_data=val_ds
     )
 
-_, accuracy = car_truck_model_base.evaluate(x=X_test, y=y_test)
+_, accuracy = car_truck_model_base.evaluate(test_ds)
 print(f"Base Model Accuracy:  {accuracy}")
 
 plot_model_accuracy(base_model_hist_base)
@@ -598,17 +504,14 @@ plot_model_results(base_model_hist_base)
 # In[ ]:
 
 
-my_img = X_test[0].astype(int)
-layer_outputs = [layer.output for layer in car_truck_model_base.layers]
-layers_model = keras.Model(inputs=car_truck_model_base.input, outputs=layer_outputs)
-outputs = layers_model.predict(my_img.reshape(1, 32, 32, 3))
+base_activations = extract_activations(car_truck_model_base, X_test[:1])
 
 
 # In[ ]:
 
 
 print("Feature Map, Layer 0")
-plot_feature_map(layer=0, n_col=8, n_row=4)
+plot_feature_map(base_activations, layer=0, n_col=8, n_row=4)
 
 
 # ##### Modeling | CNN | Optimized Model
@@ -619,26 +522,7 @@ plot_feature_map(layer=0, n_col=8, n_row=4)
 ###############################################################################
 # CNN Optimized Model
 ###############################################################################
-def build_model():
-    model = Sequential()
-    model.add(Conv2D(32, (3,3), activation="relu", 
-                     input_shape=X_train.shape[1:]))
-    model.add(MaxPool2D(pool_size=(2,2)))
-    model.add(Dropout(rate=0.35000000000000003))
-    model.add(Conv2D(16, (3,3) ))
-    model.add(MaxPool2D(pool_size=(2,2)))
-    model.add(Dropout(rate=0.35000000000000003))
-    model.add(Flatten())
-    model.add(Dense(units=128, activation="relu"))
-    model.add(Dense(units=2, activation="sigmoid"))
-
-    model.compile(
-        optimizer="adam", 
-        loss="binary_crossentropy", 
-        metrics=["accuracy"])
-    return(model)
-
-car_truck_model = build_model()
+car_truck_model = build_model(cnn_scaler)
 car_truck_model.summary()
 
 
@@ -647,18 +531,25 @@ car_truck_model.summary()
 
 ###############################################################################
 # CNN Optimized Model | Fit and Evaluate Results
+# Checkpoints every epoch to checkpoints/optimized; rerunning the cell after
+# an interruption resumes where it stopped, and model_hist always holds
+# every epoch of the run.  Early stopping watches val_loss and the best
+# weights are restored at the end.  The directory is shared with
+# `python -m vehicle_classification train`, which refuses to resume it
+# with a different config.
 ###############################################################################
 seed(1842)
-early_stop = EarlyStopping(patience=5, monitor='accuracy')
 
-model_hist = car_truck_model.fit(
-    x=X_train, 
-    y=y_train, 
-    epochs=100, 
-    verbose="auto", 
-    use_multiprocessing=True, 
-    validation_split=0.2,
-    callbacks=[early_stop]
+model_hist = fit_resumable(
+    car_truck_model,
+    train_ds,
+    val_ds,
+    epochs=100,
+    checkpoint_dir=Path("checkpoints") / "optimized",
+    monitor="val_loss",
+    patience=5,
+    verbose="auto",
+    config=run_config("optimized", VEHICLE_CLASSES, seed=1842)
     )
 
 
@@ -668,7 +559,7 @@ model_hist = car_truck_model.fit(
 ###############################################################################
 # Print and plot optimized model accuracy
 ###############################################################################
-opt_loss, accuracy = car_truck_model.evaluate(x=X_test, y=y_test)
+opt_loss, accuracy = car_truck_model.evaluate(test_ds)
 
 print(f"\nOptimized Model Accuracy:  {np.round(accuracy, 4)}")
 plot_model_accuracy(model_hist)
@@ -684,6 +575,40 @@ print(f"\nOptimized Model Loss:  {np.round(opt_loss, 4)}")
 plot_model_results(model_hist)
 
 
+# In[ ]:
+
+
+###############################################################################
+# Save optimized model for serving
+# (python -m vehicle_classification serve --model models/car_truck_cnn)
+# The fused scaler is part of the model, so the server takes raw pixels.
+###############################################################################
+MODEL_DIR = Path("models")
+car_truck_model.save(MODEL_DIR / "car_truck_cnn")
+save_class_names(MODEL_DIR / "car_truck_cnn", VEHICLE_CLASSES)
+
+
+# In[ ]:
+
+
+###############################################################################
+# Export TFLite artifacts (float32 and int8) and measure the accuracy delta
+###############################################################################
+tflite_paths = {
+    quantize: export_tflite(
+        car_truck_model, MODEL_DIR / f"car_truck_cnn_{quantize}.tflite",
+        quantize=quantize, X_calib=X_train[fit_idx], classes=VEHICLE_CLASSES)
+    for quantize in ("none", "int8")}
+
+tflite_metrics = compare_tflite(car_truck_model, tflite_paths, X_test, y_test)
+print(tabulate(
+    [[label, *np.round(values, 4)] for label, values in tflite_metrics.items()],
+    tablefmt='grid',
+    headers=["Model", "Accuracy", "Recall", "Precision", "FPR", "FDR"]))
+for quantize, path in tflite_paths.items():
+    print(f"{path.name}:\t{path.stat().st_size / 1024:.1f} KiB")
+
+
 # #### Optimized Model | Image Layer Analysis
 # > Plot feature maps across different layers with the intent to interpret the model results.
 
@@ -696,45 +621,62 @@ plot_image(X_test.astype(int), idx=0)
 # In[ ]:
 
 
-my_img = X_test[0].astype(int)
-layer_outputs = [layer.output for layer in car_truck_model.layers]
-layers_model = keras.Model(inputs=car_truck_model.input, outputs=layer_outputs)
-outputs = layers_model.predict(my_img.reshape(1, 32, 32, 3))
+###############################################################################
+# Activations for the whole test set in one batched pass, stored as float16
+# per layer and memory-mapped back lazily.  The last layer holds the class
+# probabilities, which locate the misclassified trucks.
+###############################################################################
+activations = write_activations(
+    car_truck_model, X_test, Path("artifacts") / "activations" / "car_truck_cnn")
+
+truck_probs = activations[-1]
+misclassified_trucks = np.flatnonzero(
+    (y_test.reshape(-1) == 1) & (np.asarray(truck_probs).argmax(axis=1) != 1))
+print(f"Misclassified trucks: {len(misclassified_trucks)}")
 
 
 # In[ ]:
 
 
 print("Feature Map, Layer 0")
-plot_feature_map(layer=0, n_col=8, n_row=4)
+plot_feature_map(activations, layer=0, n_col=8, n_row=4)
 
 
 # In[ ]:
 
 
 print("Feature Map, Layer 1")
-plot_feature_map(layer=1, n_col=8, n_row=4)
+plot_feature_map(activations, layer=1, n_col=8, n_row=4)
 
 
 # In[ ]:
 
 
 print("Feature Map, Layer 2")
-plot_feature_map(layer=2, n_col=8, n_row=4)
+plot_feature_map(activations, layer=2, n_col=8, n_row=4)
 
 
 # In[ ]:
 
 
 print("Feature Map, Layer 3")
-plot_feature_map(layer=3, n_col=8, n_row=2)
+plot_feature_map(activations, layer=3, n_col=8, n_row=2)
 
 
 # In[ ]:
 
 
 print("Feature Map, Layer 4")
-plot_feature_map(layer=4, n_col=8, n_row=2)
+plot_feature_map(activations, layer=4, n_col=8, n_row=2)
+
+
+# In[ ]:
+
+
+print("Feature Map, Layer 0 | First misclassified truck")
+if len(misclassified_trucks):
+    plot_feature_map(activations, layer=0, n_col=8, n_row=4,
+                     idx=misclassified_trucks[0])
 
 
 # Comparison of Models (Metrics)
@@ -744,17 +686,19 @@ plot_feature_map(layer=4, n_col=8, n_row=2)
 
 ###############################################################################
 # Create Confusion Matrix
+# Both models are scored in a single streaming pass over the test set.
 ###############################################################################
+evaluations = evaluate_models(
+    {"Base Model": car_truck_model_base, "Optimized Model": car_truck_model},
+    test_ds)
 
 # Base Model 
-y_preds_base = car_truck_model_base.predict(X_test).argmax(axis=1)
-y_test_base = y_test.argmax(axis=1)
-car_truck_conf_mtx_base =     confusion_matrix(y_true=y_test_base, y_pred=y_preds_base)
+car_truck_conf_base = evaluations["Base Model"].confusion
+car_truck_conf_mtx_base = car_truck_conf_base.matrix
 
 # Optimized Model
-y_preds_car_truck = car_truck_model.predict(X_test).argmax(axis=1)
-y_test_car_truck = y_test.argmax(axis=1)
-car_truck_conf_mtx =     confusion_matrix(y_true=y_test_car_truck, y_pred=y_preds_car_truck)
+car_truck_conf = evaluations["Optimized Model"].confusion
+car_truck_conf_mtx = car_truck_conf.matrix
 
 
 print("\nConfusion Matrix")
@@ -774,24 +718,26 @@ print(tabulate(car_truck_conf_mtx, tablefmt='grid'))
 acc_b = get_acc_from_conf(car_truck_conf_mtx_base)
 acc_o = get_acc_from_conf(car_truck_conf_mtx)
 
+# get_acc_from_conf returns (overall, class 0, class 1, ...)
 print(f"Accuracy:")
-print(f"Base:       Overall: {acc_b[0]}\tTruck: {acc_b[1]}\tCar: {acc_b[2]}")
-print(f"Optimized:  Overall: {acc_o[0]}\tTruck: {acc_o[1]}\tCar: {acc_o[2]}")
+for label, acc in (("Base", acc_b), ("Optimized", acc_o)):
+    per_class = "\t".join(f"{name.title()}: {value}"
+                          for name, value in zip(CLASS_NAMES, acc[1:]))
+    print(f"{label + ':':<12}Overall: {acc[0]}\t{per_class}")
 
 
 # In[ ]:
 
 
 ###############################################################################
-# Accuracy, Recall, Precision, FPR, FDR
+# Accuracy, Recall, Precision, FPR, FDR, AUC
 ###############################################################################
 model_metrics_dict = {
-    'Metrics': ['Accuracy', 'Recall', 'Precision','FPR', 'FDR'],
+    'Metrics': list(METRIC_NAMES),
     'Base Model': 
-        np.round(get_metrics(y_true=y_test_base, y_preds=y_preds_base), 4),
+        np.round(evaluations["Base Model"].metrics(), 4),
     'Optimized Model': 
-        np.round(
-            get_metrics(y_true=y_test_car_truck, y_preds=y_preds_car_truck), 4)
+        np.round(evaluations["Optimized Model"].metrics(), 4)
     }
 
 model_metric_tbl = tabulate(
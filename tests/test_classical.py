@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from sklearn.decomposition import NMF, PCA
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from vehicle_classification.classical import FusedLDA
+
+###############################################################################
+# FusedLDA folds scaler -> projection -> LDA into one affine map; scoring
+# must match the unfused sklearn pipeline.
+###############################################################################
+SHAPE = (4, 4, 3)
+
+def make_images(n_classes: int, n_per_class: int=120, seed: int=1842):
+    rng = np.random.default_rng(seed)
+    X, y = [], []
+    for k in range(n_classes):
+        # each class brightens its own block of pixels
+        base = rng.integers(0, 200, size=(n_per_class,) + SHAPE)
+        base[:, k % SHAPE[0]] += 40
+        X.append(base)
+        y.append(np.full((n_per_class, 1), k))
+    return(np.concatenate(X).astype(np.uint8), np.concatenate(y).astype(np.uint8))
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+def test_fused_pca_matches_pipeline(n_classes):
+    X, y = make_images(n_classes)
+    X_flat = X.reshape(len(X), -1).astype(np.float64)
+    pipeline = make_pipeline(StandardScaler(), PCA(n_components=10, random_state=0),
+                             LDA()).fit(X_flat, y.ravel())
+
+    fused = FusedLDA(pipeline[1], scaler=pipeline[0], chunk_size=64).fit(X, y)
+
+    np.testing.assert_allclose(fused.predict_proba(X),
+                               pipeline.predict_proba(X_flat), atol=1e-4)
+    np.testing.assert_array_equal(fused.predict(X), pipeline.predict(X_flat))
+    assert fused.coef_.dtype == np.float32
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+def test_fused_nmf_matches_projection(n_classes):
+    X, y = make_images(n_classes)
+    X_flat = X.reshape(len(X), -1).astype(np.float64)
+    nmf = NMF(n_components=8, init="nndsvda", max_iter=300, random_state=0).fit(X_flat)
+    # the fused path projects onto the loadings: X @ H.T
+    projected = X_flat @ nmf.components_.T
+    lda = LDA().fit(projected, y.ravel())
+
+    fused = FusedLDA(nmf, chunk_size=64).fit(X, y)
+
+    np.testing.assert_allclose(fused.predict_proba(X),
+                               lda.predict_proba(projected), atol=1e-4)
+    np.testing.assert_array_equal(fused.predict(X), lda.predict(projected))
@@ -0,0 +1,66 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from vehicle_classification.config import INPUT_SHAPE
+from vehicle_classification.ingestion import Frame, IngestionPipeline
+
+###############################################################################
+# Each drop policy bounds the lane queue the way it promises, block loses
+# nothing, and a failing predict_fn counts its batch as dropped without
+# stalling the drain in close().
+###############################################################################
+def stub_predict(images: np.ndarray) -> np.ndarray:
+    return(np.tile([[0.3, 0.7]], (len(images), 1)))
+
+def failing_predict(images: np.ndarray) -> np.ndarray:
+    raise RuntimeError("model unavailable")
+
+def run_lane(policy: str, n_frames: int, max_queue: int,
+             predict_fn=stub_predict) -> tuple:
+    # drop-* submits never await, so nothing is dequeued until close()
+    # and exactly n_frames - max_queue frames overflow the lane
+    results, accepted = [], []
+
+    async def main():
+        pipeline = IngestionPipeline(
+            predict_fn, lanes=1, max_queue=max_queue, max_batch=4,
+            max_wait_ms=1.0, decode_workers=1, policy=policy,
+            on_result=lambda frame, probs: results.append(frame.seq))
+        async with pipeline:
+            for seq in range(n_frames):
+                frame = Frame(0, seq, np.zeros(INPUT_SHAPE, dtype=np.uint8))
+                accepted.append(await pipeline.submit(frame))
+        return(pipeline.report())
+
+    return(asyncio.run(main()), results, accepted)
+
+def test_drop_oldest_keeps_the_latest_frames():
+    report, results, accepted = run_lane("drop-oldest", 10, max_queue=4)
+    assert all(accepted)
+    assert report["dropped"] == 6
+    assert report["lanes"][0]["max_depth"] == 4
+    assert sorted(results) == [6, 7, 8, 9]
+
+def test_drop_newest_rejects_incoming_frames():
+    report, results, accepted = run_lane("drop-newest", 10, max_queue=4)
+    assert accepted == [True] * 4 + [False] * 6
+    assert report["dropped"] == 6
+    assert report["lanes"][0]["max_depth"] == 4
+    assert sorted(results) == [0, 1, 2, 3]
+
+def test_block_classifies_every_frame():
+    report, results, accepted = run_lane("block", 50, max_queue=2)
+    assert all(accepted)
+    assert report["dropped"] == 0
+    assert report["lanes"][0]["max_depth"] <= 2
+    assert sorted(results) == list(range(50))
+
+@pytest.mark.parametrize("policy", ["drop-oldest", "block"])
+def test_predict_failures_count_as_dropped(policy):
+    report, results, _ = run_lane(policy, 8, max_queue=8,
+                                  predict_fn=failing_predict)
+    assert results == []
+    assert report["classified"] == 0
+    assert report["dropped"] == 8
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from sklearn.metrics import confusion_matrix, precision_score, recall_score
+
+from vehicle_classification.metrics import ConfusionMatrix, get_acc_from_conf, \
+    get_metrics
+
+###############################################################################
+# The bincount confusion matrix and the metrics read off it must agree with
+# sklearn.metrics; empty denominators give NaN instead of sklearn's 0.
+###############################################################################
+def random_labels(num_classes: int, n: int=500, seed: int=1842):
+    rng = np.random.default_rng(seed)
+    return(rng.integers(0, num_classes, n), rng.integers(0, num_classes, n))
+
+@pytest.mark.parametrize("num_classes", [2, 3, 5])
+def test_confusion_matrix_matches_sklearn(num_classes):
+    y_true, y_pred = random_labels(num_classes)
+    cm = ConfusionMatrix.from_predictions(y_true, y_pred, num_classes)
+    labels = list(range(num_classes))
+    np.testing.assert_array_equal(
+        cm.matrix, confusion_matrix(y_true, y_pred, labels=labels))
+    np.testing.assert_allclose(
+        cm.recall(), recall_score(y_true, y_pred, labels=labels, average=None))
+    np.testing.assert_allclose(
+        cm.precision(), precision_score(y_true, y_pred, labels=labels, average=None))
+
+def test_streaming_updates_match_one_pass():
+    y_true, y_pred = random_labels(3)
+    streamed = ConfusionMatrix(3)
+    for start in range(0, len(y_true), 64):
+        streamed.update(y_true[start:start + 64], y_pred[start:start + 64])
+    np.testing.assert_array_equal(
+        streamed.matrix, ConfusionMatrix.from_predictions(y_true, y_pred, 3).matrix)
+
+def test_binary_metrics_match_sklearn():
+    y_true, y_pred = random_labels(2)
+    tn, fp, fn, tp = confusion_matrix(y_true, y_pred).ravel()
+    accuracy, recall, precision, fpr, fdr = get_metrics(y_true, y_pred, 2)
+    assert accuracy == pytest.approx((tp + tn) / len(y_true))
+    assert recall == pytest.approx(recall_score(y_true, y_pred))
+    assert precision == pytest.approx(precision_score(y_true, y_pred))
+    assert fpr == pytest.approx(fp / (fp + tn))
+    assert fdr == pytest.approx(fp / (fp + tp))
+
+def test_empty_denominators_are_nan():
+    # class 1 never occurs and is never predicted
+    y_true = np.zeros(10, dtype=int)
+    y_pred = np.zeros(10, dtype=int)
+    accuracy, recall, precision, fpr, fdr = get_metrics(y_true, y_pred, 2)
+    assert accuracy == 1.0
+    assert np.isnan(recall) and np.isnan(precision) and np.isnan(fdr)
+    assert fpr == 0.0
+    cm = ConfusionMatrix.from_predictions(y_true, y_pred, 2)
+    assert np.isnan(cm.recall()[1]) and np.isnan(cm.precision()[1])
+    assert np.isnan(ConfusionMatrix(2).accuracy())
+
+def test_acc_from_conf_is_overall_then_per_class():
+    y_true, y_pred = random_labels(3)
+    conf = confusion_matrix(y_true, y_pred)
+    acc = get_acc_from_conf(conf)
+    assert len(acc) == 4
+    assert acc[0] == pytest.approx(np.mean(y_true == y_pred))
+    np.testing.assert_allclose(
+        acc[1:], recall_score(y_true, y_pred, average=None))
+    assert np.isnan(get_acc_from_conf([[3, 0], [0, 0]])[2])
@@ -0,0 +1,66 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from vehicle_classification.config import INPUT_SHAPE
+from vehicle_classification.serving import MicroBatcher, make_handler
+
+###############################################################################
+# /predict must answer malformed JSON bodies with a 400 and a JSON error,
+# never a prediction made from wrapped or truncated pixels.
+###############################################################################
+def stub_predict(images: np.ndarray) -> np.ndarray:
+    return(np.tile([[0.3, 0.7]], (len(images), 1)))
+
+@pytest.fixture
+def server_url():
+    batcher = MicroBatcher(stub_predict, max_batch=4, max_wait_ms=1.0)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(batcher))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/predict"
+    server.shutdown()
+    server.server_close()
+    batcher.close()
+
+def post_json(url: str, body: bytes):
+    request = urllib.request.Request(
+        url, data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return(response.status, json.loads(response.read()))
+    except urllib.error.HTTPError as exc:
+        return(exc.code, json.loads(exc.read()))
+
+def images_body(images) -> bytes:
+    return(json.dumps({"images": images}).encode())
+
+def test_valid_json_is_classified(server_url):
+    images = np.full((2,) + INPUT_SHAPE, 255, dtype=np.uint8).tolist()
+    status, payload = post_json(server_url, images_body(images))
+    assert status == 200
+    assert len(payload["classes"]) == 2
+
+def test_bad_json_is_rejected(server_url):
+    status, payload = post_json(server_url, b'{"images": [[[')
+    assert status == 400
+    assert "error" in payload
+
+def test_wrong_shape_is_rejected(server_url):
+    images = np.zeros((1, 16, 16, 3), dtype=np.uint8).tolist()
+    status, payload = post_json(server_url, images_body(images))
+    assert status == 400
+    assert "error" in payload
+
+@pytest.mark.parametrize("value", [300, -1, 0.5])
+def test_out_of_range_pixels_are_rejected(server_url, value):
+    images = np.zeros((1,) + INPUT_SHAPE).tolist()
+    images[0][0][0][0] = value
+    status, payload = post_json(server_url, images_body(images))
+    assert status == 400
+    assert "0..255" in payload["error"]
@@ -0,0 +1,89 @@
+###############################################################################
+# Optimized Toll Booths | Car / Truck Image Classifier
+# Shared loaders, input pipelines, preprocessing and models used by the
+# CIFAR10_Classifier notebook and the command line entry points.
+#
+# Submodules are imported on first attribute access, so
+# `from vehicle_classification import load_predict_fn` pulls in numpy only and
+# TensorFlow, keras_tuner, sklearn and matplotlib load when something that
+# needs them is used.
+###############################################################################
+import importlib
+
+from .config import (BATCH_SIZE, CLASS_NAMES, INPUT_SHAPE, NUM_CLASSES, SEED,
+                     VEHICLE_CLASSES)
+
+_EXPORTS = {
+    # data
+    "cifar10_cars_trucks": "data",
+    "cifar10_cars_trucks_cached": "data",
+    "cifar10_subset": "data",
+    "cifar10_subset_cached": "data",
+    "train_val_split": "data",
+    "split_indices": "data",
+    # input pipelines and preprocessing
+    "make_dataset": "pipeline",
+    "Augmentation": "augmentation",
+    "MinMaxImageScaler": "preprocessing",
+    "SCALER_LAYER_NAME": "preprocessing",
+    "my_flattener": "preprocessing",
+    "my_minmax": "preprocessing",
+    # models, tuning and training
+    "input_layers": "models",
+    "build_base_model": "models",
+    "build_model": "models",
+    "CarTruckCNN": "hyperband",
+    "PrunedHyperband": "hyperband",
+    "build_tuner": "tuning",
+    "train_model": "training",
+    "fit_resumable": "training",
+    "train_worker": "distributed",
+    # decomposition
+    "fit_streaming_pca": "decomposition",
+    "n_components_for_variance": "decomposition",
+    "fit_nmf": "decomposition",
+    "benchmark_nmf": "decomposition",
+    "FusedLDA": "classical",
+    "TransformCache": "transform_cache",
+    "data_fingerprint": "transform_cache",
+    # metrics and evaluation
+    "ConfusionMatrix": "metrics",
+    "get_metrics": "metrics",
+    "get_acc_from_conf": "metrics",
+    "METRIC_NAMES": "metrics",
+    "StreamingEvaluation": "metrics",
+    "evaluate_models": "evaluation",
+    "ClassifierResults": "results",
+    "make_predictions": "results",
+    "ResultsStore": "results",
+    "extract_activations": "interpretability",
+    "write_activations": "interpretability",
+    # instrumentation
+    "TRACER": "instrumentation",
+    "span": "instrumentation",
+    "traced": "instrumentation",
+    "serve_metrics": "instrumentation",
+    # export and serving
+    "export_tflite": "export",
+    "tflite_predict": "export",
+    "compare_tflite": "export",
+    "load_predict_fn": "serving",
+    "MicroBatcher": "serving",
+    "serve": "serving",
+    "save_class_names": "serving",
+    "IngestionPipeline": "ingestion",
+    "replay_frames": "ingestion",
+}
+
+__all__ = ["BATCH_SIZE", "CLASS_NAMES", "INPUT_SHAPE", "NUM_CLASSES", "SEED",
+           "VEHICLE_CLASSES", *_EXPORTS]
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return(value)
+
+def __dir__():
+    return(sorted(set(globals()) | set(__all__)))
@@ -0,0 +1,155 @@
+###############################################################################
+# Command Line
+#
+#   python -m vehicle_classification prepare-data
+#   python -m vehicle_classification train --model optimized --output models/car_truck_cnn
+#   python -m vehicle_classification export --model models/car_truck_cnn --quantize int8
+#   python -m vehicle_classification serve --model models/car_truck_cnn
+#   python -m vehicle_classification load-test --requests 2000
+#   python -m vehicle_classification ingest --model models/car_truck_cnn --lanes 8 --rate 30
+#   python -m vehicle_classification tune --workers 4
+#   python -m vehicle_classification distributed --workers 1 2 4 --epochs 3
+#   python -m vehicle_classification bench suite
+#
+# Each subcommand imports only the modules it needs.  --trace PATH writes
+# the stage spans (load, scale, fit, predict, ...) as a Chrome / Perfetto
+# trace (.json or .json.gz) and prints a per-stage summary.
+###############################################################################
+import argparse
+import importlib
+import json
+import sys
+from pathlib import Path
+
+from .config import CIFAR10_LABELS, SEED, VEHICLE_CLASSES
+
+def prepare_data(args) -> int:
+    from .data import cifar10_subset_cached
+
+    (X_train, y_train), (X_test, y_test) = cifar10_subset_cached(
+        args.classes, args.cache_dir, verify=args.verify, refresh=args.refresh)
+    print(f"Train: X={X_train.shape}\ty={y_train.shape}")
+    print(f"Test : X={X_test.shape}\ty={y_test.shape}")
+    return(0)
+
+def train(args) -> int:
+    from .training import train_model
+
+    _, _, scores = train_model(args.model, epochs=args.epochs, seed=args.seed,
+                               fast=args.fast, output=args.output,
+                               checkpoint_dir=args.checkpoint_dir,
+                               save_every=args.save_every, log_dir=args.log_dir,
+                               augment=args.augment, classes=args.classes,
+                               profile_batch=tuple(args.profile_batches or ()) or 0)
+    print(json.dumps(scores, indent=2))
+    return(0)
+
+def export(args) -> int:
+    import tensorflow as tf
+
+    from .data import cifar10_subset_cached
+    from .export import export_tflite
+    from .serving import class_names_path
+
+    model = tf.keras.models.load_model(args.model)
+    # the .tflite keeps the class list the model was trained on
+    sidecar = class_names_path(args.model)
+    classes = json.loads(sidecar.read_text())["classes"] if sidecar.exists() else None
+    X_calib = None
+    if args.quantize == "int8":
+        (X_calib, _), _ = cifar10_subset_cached(classes or VEHICLE_CLASSES)
+    output = args.output or Path(args.model).with_name(
+        f"{Path(args.model).name}_{args.quantize}.tflite")
+    path = export_tflite(model, output, quantize=args.quantize, X_calib=X_calib,
+                         classes=classes)
+    print(f"{path}: {path.stat().st_size / 1e6:.2f} MB")
+    return(0)
+
+def _add_classes(parser: argparse.ArgumentParser):
+    parser.add_argument("--classes", type=int, nargs="+", default=list(VEHICLE_CLASSES),
+                        metavar="LABEL",
+                        help="CIFAR-10 labels to keep, in output order (default: "
+                        + " ".join(f"{c}={CIFAR10_LABELS[c]}" for c in VEHICLE_CLASSES) + ")")
+
+def _delegate(module: str, command: str=None):
+    # tune / bench / serve / ... forward their arguments to the module's own
+    # parser, so the module (and numpy, TensorFlow, ...) is only imported
+    # when its subcommand runs
+    def run(args) -> int:
+        argv = ([command] if command else []) + args.forwarded
+        return(importlib.import_module(f".{module}", __package__).main(argv))
+    return(run)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m vehicle_classification",
+        description="Car / truck image classifier")
+    parser.add_argument("--trace", type=Path, default=None,
+                        help="write a Chrome trace of the pipeline stages")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_data = sub.add_parser("prepare-data", help="download and cache the vehicle arrays")
+    _add_classes(p_data)
+    p_data.add_argument("--cache-dir", type=Path, default=None)
+    p_data.add_argument("--verify", action="store_true", help="check array checksums")
+    p_data.add_argument("--refresh", action="store_true", help="rebuild the cache")
+    p_data.set_defaults(func=prepare_data)
+
+    p_train = sub.add_parser("train", help="train the base or optimized CNN")
+    p_train.add_argument("--model", choices=("base", "optimized"), default="optimized")
+    _add_classes(p_train)
+    p_train.add_argument("--epochs", type=int, default=100)
+    p_train.add_argument("--seed", type=int, default=SEED)
+    p_train.add_argument("--fast", action="store_true",
+                         help="XLA, steps_per_execution and mixed bfloat16")
+    p_train.add_argument("--augment", action="store_true",
+                         help="flips, crops, colour jitter and CutMix / MixUp")
+    p_train.add_argument("--output", type=Path, default=None)
+    p_train.add_argument("--checkpoint-dir", type=Path, default=None,
+                         help="resume from / checkpoint to (default checkpoints/<model>)")
+    p_train.add_argument("--save-every", type=int, default=1,
+                         help="epochs between checkpoints")
+    p_train.add_argument("--log-dir", type=Path, default=None,
+                         help="write TensorBoard logs")
+    p_train.add_argument("--profile-batches", type=int, nargs=2, default=None,
+                         metavar=("START", "STOP"),
+                         help="TensorFlow profiler range (needs --log-dir)")
+    p_train.set_defaults(func=train)
+
+    p_export = sub.add_parser("export", help="convert a saved model to TFLite")
+    p_export.add_argument("--model", required=True)
+    p_export.add_argument("--quantize", choices=("none", "dynamic", "int8"),
+                          default="none")
+    p_export.add_argument("--output", type=Path, default=None)
+    p_export.set_defaults(func=export)
+
+    for name, module, command, help in (
+            ("serve", "serving", "serve", "serve a saved model"),
+            ("load-test", "serving", "load-test", "replay images against a server"),
+            ("ingest", "ingestion", None,
+             "classify synthetic camera lanes replaying CIFAR test images"),
+            ("tune", "tuning", None, "parallel Hyperband search"),
+            ("distributed", "distributed", None, "multi-worker data-parallel training"),
+            ("bench", "benchmarks", None, "benchmark suite")):
+        # everything after the subcommand is left unparsed and forwarded
+        p = sub.add_parser(name, help=help, add_help=False)
+        p.set_defaults(func=_delegate(module, command), forwarded=[])
+    return(parser)
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args, forwarded = parser.parse_known_args(argv)
+    if forwarded and not hasattr(args, "forwarded"):
+        parser.error(f"unrecognized arguments: {' '.join(forwarded)}")
+    if hasattr(args, "forwarded"):
+        args.forwarded = forwarded
+    code = args.func(args)
+    if args.trace is not None:
+        from .instrumentation import TRACER
+
+        TRACER.write_chrome_trace(args.trace)
+        print(json.dumps(TRACER.summary(), indent=2))
+    return(code)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+from dataclasses import dataclass
+
+import tensorflow as tf
+
+###############################################################################
+# Batched In-Graph Augmentation
+# Runs on whole float batches after the preprocessing map in make_dataset:
+# random horizontal flips, pad-and-crop, colour jitter (brightness,
+# contrast, saturation) and per-sample CutMix / MixUp against the batch in
+# reverse order.  Every op is a stateless tf.random op seeded from
+# (epoch seed, batch index); pipeline._augmented draws a new epoch seed from
+# a seeded generator each time the dataset is iterated, so a seeded run sees
+# the same augmentations and every epoch gets new draws, shuffled or not.
+# Nothing is written to disk.
+###############################################################################
+@dataclass
+class Augmentation:
+    flip: bool = True
+    crop_pad: int = 4
+    brightness: float = 0.1
+    contrast: float = 0.1
+    saturation: float = 0.1
+    mix_prob: float = 0.5     # fraction of samples that are mixed
+    cutmix_prob: float = 0.5  # share of mixed samples using CutMix over MixUp
+    alpha: float = 0.2        # Beta(alpha, alpha) mixing coefficient
+    max_value: float = 255.0  # pixels are unscaled; the model holds the scaler
+
+    def __call__(self, x, y, seed):
+        seeds = tf.random.experimental.stateless_split(seed, num=6)
+        if self.flip:
+            x = _random_flip(x, seeds[0])
+        if self.crop_pad:
+            x = _random_crop(x, self.crop_pad, seeds[1])
+        if self.brightness or self.contrast or self.saturation:
+            x = _colour_jitter(x, self.brightness, self.contrast,
+                               self.saturation, self.max_value, seeds[2])
+        if self.mix_prob:
+            x, y = _cutmix_mixup(x, y, self.mix_prob, self.cutmix_prob,
+                                 self.alpha, seeds[3:])
+        return(x, y)
+
+def _uniform(shape, seed, minval=0.0, maxval=1.0):
+    return(tf.random.stateless_uniform(shape, seed, minval=minval, maxval=maxval))
+
+def _per_image(v):
+    return(v[:, None, None, None])
+
+def _random_flip(x, seed):
+    flip = _uniform(tf.shape(x)[:1], seed) < 0.5
+    return(tf.where(_per_image(flip), tf.reverse(x, axis=[2]), x))
+
+def _random_crop(x, pad: int, seed):
+    # one gather per axis crops every image at its own offset
+    height, width = x.shape[1], x.shape[2]
+    padded = tf.pad(x, [[0, 0], [pad, pad], [pad, pad], [0, 0]], mode="REFLECT")
+    offsets = tf.random.stateless_uniform(
+        tf.stack([tf.shape(x)[0], 2]), seed, maxval=2 * pad + 1, dtype=tf.int32)
+    rows = offsets[:, :1] + tf.range(height)[None, :]
+    cols = offsets[:, 1:] + tf.range(width)[None, :]
+    padded = tf.gather(padded, rows, axis=1, batch_dims=1)
+    return(tf.gather(padded, cols, axis=2, batch_dims=1))
+
+def _colour_jitter(x, brightness: float, contrast: float, saturation: float,
+                   max_value: float, seed):
+    n = tf.shape(x)[:1]
+    seeds = tf.random.experimental.stateless_split(seed, num=3)
+    x = x + _per_image(_uniform(n, seeds[0], -brightness, brightness)) * max_value
+    mean = tf.reduce_mean(x, axis=[1, 2, 3], keepdims=True)
+    x = (x - mean) * _per_image(_uniform(n, seeds[1], 1 - contrast, 1 + contrast)) + mean
+    gray = tf.reduce_mean(x, axis=-1, keepdims=True)
+    x = (x - gray) * _per_image(_uniform(n, seeds[2], 1 - saturation, 1 + saturation)) + gray
+    return(tf.clip_by_value(x, 0.0, max_value))
+
+def _beta(n, alpha: float, seed):
+    seeds = tf.random.experimental.stateless_split(seed, num=2)
+    a = tf.random.stateless_gamma(n, seeds[0], alpha=alpha)
+    b = tf.random.stateless_gamma(n, seeds[1], alpha=alpha)
+    return(a / (a + b))
+
+def _cutmix_mixup(x, y, mix_prob: float, cutmix_prob: float, alpha: float, seeds):
+    n = tf.shape(x)[:1]
+    height, width = x.shape[1], x.shape[2]
+    x2, y2 = tf.reverse(x, axis=[0]), tf.reverse(y, axis=[0])
+    lam = _beta(n, alpha, seeds[0])
+    draws = tf.random.stateless_uniform(tf.concat([n, [4]], 0), seeds[1])
+    mixed = draws[:, 0] < mix_prob
+    cutmix = draws[:, 1] < cutmix_prob
+
+    # CutMix: paste a box covering (1 - lam) of the partner image
+    cut = tf.sqrt(1.0 - lam)
+    cy, cx = draws[:, 2] * height, draws[:, 3] * width
+    y0 = tf.clip_by_value(cy - cut * height / 2, 0.0, height)
+    y1 = tf.clip_by_value(cy + cut * height / 2, 0.0, height)
+    x0 = tf.clip_by_value(cx - cut * width / 2, 0.0, width)
+    x1 = tf.clip_by_value(cx + cut * width / 2, 0.0, width)
+    grid_y = tf.range(height, dtype=tf.float32)[None, :, None]
+    grid_x = tf.range(width, dtype=tf.float32)[None, None, :]
+    box = tf.cast(
+        (grid_y >= y0[:, None, None]) & (grid_y < y1[:, None, None]) &
+        (grid_x >= x0[:, None, None]) & (grid_x < x1[:, None, None]), x.dtype)
+    box_lam = 1.0 - tf.reduce_mean(box, axis=[1, 2])
+    x_cutmix = x + (x2 - x) * box[..., None]
+
+    x_mixup = x2 + (x - x2) * _per_image(lam)
+    x_mix = tf.where(_per_image(cutmix), x_cutmix, x_mixup)
+    lam = tf.where(cutmix, box_lam, lam)
+    y_mix = y2 + (y - y2) * lam[:, None]
+
+    x = tf.where(_per_image(mixed), x_mix, x)
+    y = tf.where(mixed[:, None], y_mix, y)
+    return(x, y)
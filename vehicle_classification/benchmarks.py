@@ -0,0 +1,375 @@
+###############################################################################
+# Benchmarks
+#
+#   python -m vehicle_classification.benchmarks suite --epochs 10
+#   python -m vehicle_classification.benchmarks compare
+#   python -m vehicle_classification.benchmarks fast-training --epochs 5
+#   python -m vehicle_classification.benchmarks augmentation --epochs 5
+#
+# suite runs every model variant from the notebook (base CNN, optimized
+# CNN, LDA-PCA, LDA-NMF) under the notebook seed, each in its own process so
+# peak RSS is per variant, and appends one JSON line per variant to
+# benchmarks/results.jsonl tagged with the git commit.  compare checks the
+# latest run of each variant against an earlier commit and exits non-zero
+# on a wall-time or accuracy regression.
+#
+# fast-training trains build_base_model / build_model in the current
+# configuration and in fast mode (XLA + steps_per_execution + bfloat16 when
+# the CPU supports it) and reports epoch time and test accuracy for each.
+#
+# augmentation trains build_model with and without the in-graph
+# augmentation stage and exits non-zero when it adds more than
+# AUGMENT_OVERHEAD (15%) to the steady-state epoch time.
+#
+# TensorFlow is only imported on the CNN paths, so the LDA variants'
+# wall time and peak RSS do not include it.
+###############################################################################
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .config import SEED
+
+RESULTS_FILE = Path("benchmarks") / "results.jsonl"
+VARIANTS = ("cnn_base", "cnn_optimized", "lda_pca", "lda_nmf")
+TIME_TOLERANCE = 0.10
+ACCURACY_TOLERANCE = 0.01
+AUGMENT_OVERHEAD = 0.15
+
+###############################################################################
+# Epoch Timing | Keras Callback, built on first use
+###############################################################################
+def epoch_timer():
+    from keras.callbacks import Callback
+
+    class EpochTimer(Callback):
+        def on_train_begin(self, logs=None):
+            self.epoch_times = []
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            self.epoch_times.append(time.perf_counter() - self._start)
+
+        def steady_epoch_time(self) -> float:
+            # the first epoch includes tracing / XLA compilation
+            times = self.epoch_times[1:] or self.epoch_times
+            return(float(np.median(times)))
+
+    return(EpochTimer())
+
+###############################################################################
+# Shared Data
+###############################################################################
+def load_benchmark_data(seed: int=SEED, augment=None):
+    from .data import cifar10_subset_cached, split_indices
+    from .pipeline import make_dataset
+    from .preprocessing import MinMaxImageScaler
+
+    (X_train, y_train), (X_test, y_test) = cifar10_subset_cached()
+    fit_idx, val_idx = split_indices()
+    scaler = MinMaxImageScaler(per_channel=True).fit(X_train, indices=fit_idx)
+    return({
+        "scaler": scaler,
+        "train_ds": make_dataset(X_train, y_train, indices=fit_idx,
+                                 shuffle=True, seed=seed, cache="",
+                                 augment=augment),
+        "val_ds": make_dataset(X_train, y_train, indices=val_idx, cache=""),
+        "test_ds": make_dataset(X_test, y_test, cache=""),
+        "n_train": len(fit_idx)})
+
+###############################################################################
+# Fast Training Mode vs Current Configuration
+###############################################################################
+def benchmark_fast_training(epochs: int=5, seed: int=SEED, data: dict=None) -> list:
+    import tensorflow as tf
+    from .models import build_base_model, build_model, fast_precision_policy
+
+    data = data or load_benchmark_data(seed)
+    rows = []
+    for name, builder in (("base", build_base_model), ("optimized", build_model)):
+        for fast in (False, True):
+            tf.keras.utils.set_random_seed(seed)
+            model = builder(data["scaler"], fast=fast)
+            timer = epoch_timer()
+            start = time.perf_counter()
+            model.fit(data["train_ds"], epochs=epochs,
+                      validation_data=data["val_ds"], callbacks=[timer], verbose=0)
+            wall = time.perf_counter() - start
+            _, accuracy = model.evaluate(data["test_ds"], verbose=0)
+            epoch_time = timer.steady_epoch_time()
+            rows.append({
+                "model": name,
+                "mode": "fast" if fast else "current",
+                "policy": fast_precision_policy() if fast else "float32",
+                "epochs": epochs,
+                "epoch_time_s": round(epoch_time, 4),
+                "samples_per_s": round(data["n_train"] / epoch_time, 1),
+                "fit_wall_s": round(wall, 2),
+                "test_accuracy": round(float(accuracy), 4)})
+    return(rows)
+
+###############################################################################
+# Augmentation Overhead
+###############################################################################
+def benchmark_augmentation(epochs: int=5, seed: int=SEED,
+                           max_overhead: float=AUGMENT_OVERHEAD) -> list:
+    import tensorflow as tf
+    from .augmentation import Augmentation
+    from .models import build_model
+
+    rows = []
+    for augment in (None, Augmentation()):
+        data = load_benchmark_data(seed, augment=augment)
+        tf.keras.utils.set_random_seed(seed)
+        model = build_model(data["scaler"])
+        timer = epoch_timer()
+        history = model.fit(data["train_ds"], epochs=epochs,
+                            validation_data=data["val_ds"], callbacks=[timer],
+                            verbose=0)
+        _, accuracy = model.evaluate(data["test_ds"], verbose=0)
+        rows.append({
+            "augment": augment is not None,
+            "epochs": epochs,
+            "epoch_time_s": round(timer.steady_epoch_time(), 4),
+            "val_loss": round(float(min(history.history["val_loss"])), 4),
+            "test_accuracy": round(float(accuracy), 4)})
+    overhead = rows[1]["epoch_time_s"] / rows[0]["epoch_time_s"] - 1.0
+    rows[1]["overhead"] = round(overhead, 4)
+    rows[1]["within_budget"] = overhead <= max_overhead
+    return(rows)
+
+###############################################################################
+# Environment
+###############################################################################
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return(round(peak / (1 << 20) if sys.platform == "darwin" else peak / 1024, 1))
+
+def git_commit() -> str:
+    try:
+        return(subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True
+                              ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return("unknown")
+
+def environment() -> dict:
+    import sklearn
+    import tensorflow as tf
+    return({
+        "commit": git_commit(),
+        "host": platform.node(),
+        "cpu": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "tensorflow": tf.__version__,
+        "sklearn": sklearn.__version__})
+
+###############################################################################
+# Model Variants
+# Each returns fit_s, samples_per_s and accuracy on the test set.
+###############################################################################
+def _run_cnn(builder, epochs: int, seed: int, data: dict) -> dict:
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(seed)
+    model = builder(data["scaler"])
+    start = time.perf_counter()
+    model.fit(data["train_ds"], epochs=epochs,
+              validation_data=data["val_ds"], verbose=0)
+    fit_s = time.perf_counter() - start
+    _, accuracy = model.evaluate(data["test_ds"], verbose=0)
+    return({"fit_s": fit_s,
+            "samples_per_s": data["n_train"] * epochs / fit_s,
+            "accuracy": float(accuracy)})
+
+def _run_lda(decomposition: str, seed: int, arrays: dict) -> dict:
+    from sklearn.decomposition import NMF, PCA
+    from sklearn.preprocessing import StandardScaler
+    from .classical import FusedLDA
+
+    # same stages and settings as the notebook's EDA cells
+    X_train = arrays["X_train"].reshape(len(arrays["X_train"]), -1)
+    np.random.seed(seed)
+    start = time.perf_counter()
+    scaler = None
+    if decomposition == "pca":
+        scaler = StandardScaler().fit(X_train)
+        projector = PCA(n_components=180, random_state=seed).fit(
+            scaler.transform(X_train))
+    else:
+        projector = NMF(n_components=100, random_state=seed, init='random',
+                        max_iter=500, tol=5e-3).fit(X_train)
+    model = FusedLDA(projector, scaler=scaler).fit(arrays["X_train"], arrays["y_train"])
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    accuracy = model.score(arrays["X_test"], arrays["y_test"])
+    predict_s = time.perf_counter() - start
+    return({"fit_s": fit_s,
+            "samples_per_s": len(X_train) / fit_s,
+            "predict_per_s": len(arrays["X_test"]) / predict_s,
+            "accuracy": float(accuracy)})
+
+def run_variant(variant: str, epochs: int=10, seed: int=SEED) -> dict:
+    from .data import cifar10_subset_cached
+
+    start_wall = time.perf_counter()
+    if variant.startswith("cnn"):
+        data = load_benchmark_data(seed)
+    else:
+        (X_train, y_train), (X_test, y_test) = cifar10_subset_cached()
+        data = {"X_train": np.asarray(X_train), "y_train": np.asarray(y_train),
+                "X_test": np.asarray(X_test), "y_test": np.asarray(y_test)}
+    load_s = time.perf_counter() - start_wall
+
+    if variant in ("cnn_base", "cnn_optimized"):
+        from .models import build_base_model, build_model
+
+        builder = build_base_model if variant == "cnn_base" else build_model
+        result = _run_cnn(builder, epochs, seed, data)
+    elif variant in ("lda_pca", "lda_nmf"):
+        result = _run_lda(variant.split("_")[1], seed, data)
+    else:
+        raise ValueError(f"variant must be one of {VARIANTS}")
+
+    return({
+        "variant": variant,
+        "seed": seed,
+        "epochs": epochs if variant.startswith("cnn") else None,
+        "wall_s": round(time.perf_counter() - start_wall, 3),
+        "data_load_s": round(load_s, 3),
+        "fit_s": round(result["fit_s"], 3),
+        "samples_per_s": round(result["samples_per_s"], 1),
+        "predict_per_s": round(result["predict_per_s"], 1)
+            if "predict_per_s" in result else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "accuracy": round(result["accuracy"], 4)})
+
+###############################################################################
+# Suite | one subprocess per variant, appended to the results file
+###############################################################################
+def run_suite(variants=VARIANTS, epochs: int=10, seed: int=SEED,
+              results_file: Path=RESULTS_FILE) -> list:
+    env, stamp = environment(), time.strftime("%Y-%m-%dT%H:%M:%S")
+    results_file = Path(results_file)
+    results_file.parent.mkdir(parents=True, exist_ok=True)
+    rows = []
+    for variant in variants:
+        proc = subprocess.run(
+            [sys.executable, "-m", "vehicle_classification.benchmarks",
+             "run-one", variant, "--epochs", str(epochs), "--seed", str(seed)],
+            capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{variant} failed with exit code "
+                               f"{proc.returncode}:\n{proc.stderr}")
+        row = {"timestamp": stamp, **env,
+               **json.loads(proc.stdout.strip().splitlines()[-1])}
+        with open(results_file, "a") as f:
+            f.write(json.dumps(row) + "\n")
+        rows.append(row)
+    return(rows)
+
+###############################################################################
+# Regression Check
+###############################################################################
+def load_results(results_file: Path=RESULTS_FILE) -> list:
+    with open(results_file) as f:
+        return([json.loads(line) for line in f if line.strip()])
+
+def compare_results(results: list, baseline_commit: str=None,
+                    time_tolerance: float=TIME_TOLERANCE,
+                    accuracy_tolerance: float=ACCURACY_TOLERANCE) -> list:
+    latest = {}
+    for row in results:
+        latest[row["variant"]] = row
+    report = []
+    for variant, row in latest.items():
+        earlier = [r for r in results if r["variant"] == variant
+                   and r["commit"] != row["commit"]
+                   and (baseline_commit is None or r["commit"] == baseline_commit)
+                   and r.get("epochs") == row.get("epochs")
+                   and r.get("host") == row.get("host")]
+        if not earlier:
+            continue
+        base = earlier[-1]
+        time_ratio = row["wall_s"] / base["wall_s"]
+        accuracy_delta = row["accuracy"] - base["accuracy"]
+        report.append({
+            "variant": variant,
+            "baseline": base["commit"],
+            "commit": row["commit"],
+            "wall_ratio": round(time_ratio, 3),
+            "accuracy_delta": round(accuracy_delta, 4),
+            "peak_rss_delta_mb": round(row["peak_rss_mb"] - base["peak_rss_mb"], 1),
+            "regression": time_ratio > 1 + time_tolerance
+                          or accuracy_delta < -accuracy_tolerance})
+    return(report)
+
+###############################################################################
+# Command Line
+###############################################################################
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Car/truck model benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_suite = sub.add_parser("suite", help="run every model variant")
+    p_suite.add_argument("--variants", nargs="+", choices=VARIANTS, default=VARIANTS)
+    p_suite.add_argument("--epochs", type=int, default=10)
+    p_suite.add_argument("--seed", type=int, default=SEED)
+    p_suite.add_argument("--results", type=Path, default=RESULTS_FILE)
+
+    p_one = sub.add_parser("run-one", help="run a single variant in-process")
+    p_one.add_argument("variant", choices=VARIANTS)
+    p_one.add_argument("--epochs", type=int, default=10)
+    p_one.add_argument("--seed", type=int, default=SEED)
+
+    p_cmp = sub.add_parser("compare", help="check the latest run for regressions")
+    p_cmp.add_argument("--baseline", default=None, help="commit to compare against")
+    p_cmp.add_argument("--results", type=Path, default=RESULTS_FILE)
+    p_cmp.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    p_cmp.add_argument("--accuracy-tolerance", type=float, default=ACCURACY_TOLERANCE)
+
+    p_fast = sub.add_parser("fast-training",
+                            help="fast training mode vs current configuration")
+    p_fast.add_argument("--epochs", type=int, default=5)
+    p_fast.add_argument("--seed", type=int, default=SEED)
+
+    p_aug = sub.add_parser("augmentation",
+                           help="epoch-time overhead of in-graph augmentation")
+    p_aug.add_argument("--epochs", type=int, default=5)
+    p_aug.add_argument("--seed", type=int, default=SEED)
+    p_aug.add_argument("--max-overhead", type=float, default=AUGMENT_OVERHEAD)
+    args = parser.parse_args(argv)
+
+    if args.command == "suite":
+        rows = run_suite(args.variants, args.epochs, args.seed, args.results)
+        print(json.dumps(rows, indent=2))
+    elif args.command == "run-one":
+        print(json.dumps(run_variant(args.variant, args.epochs, args.seed)))
+    elif args.command == "compare":
+        report = compare_results(load_results(args.results), args.baseline,
+                                 args.time_tolerance, args.accuracy_tolerance)
+        print(json.dumps(report, indent=2))
+        return(1 if any(r["regression"] for r in report) else 0)
+    elif args.command == "fast-training":
+        rows = benchmark_fast_training(epochs=args.epochs, seed=args.seed)
+        print(json.dumps(rows, indent=2))
+    elif args.command == "augmentation":
+        rows = benchmark_augmentation(args.epochs, args.seed, args.max_overhead)
+        print(json.dumps(rows, indent=2))
+        return(0 if rows[1]["within_budget"] else 1)
+    return(0)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import numpy as np
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
+
+from .decomposition import PCA_CHUNK, iter_flat_chunks
+from .instrumentation import traced
+
+###############################################################################
+# Fused LDA-PCA / LDA-NMF Classifier
+# Flatten -> StandardScaler -> projection -> LDA is an affine chain, so
+# after fitting it collapses into one (pixels x classes) float32 matrix and
+# a bias.  Scoring is a single matmul per fixed-size chunk straight from
+# uint8 images; probabilities are computed once and labels are their
+# argmax.  Usable as a CPU fallback classifier (see serving.py, .joblib).
+#
+# projector is a fitted PCA / IncrementalPCA (scaled and centred exactly as
+# its transform does) or NMF (projected onto the loadings, X @ H.T).
+###############################################################################
+class FusedLDA:
+    def __init__(self, projector, scaler=None, lda: LDA=None,
+                 chunk_size: int=PCA_CHUNK):
+        self.projector = projector
+        self.scaler = scaler
+        self.lda = lda if lda is not None else LDA()
+        self.chunk_size = chunk_size
+        self.coef_ = None
+        self.intercept_ = None
+
+    @property
+    def classes_(self) -> np.ndarray:
+        return(self.lda.classes_)
+
+    def _project_chunk(self, chunk: np.ndarray) -> np.ndarray:
+        if self.scaler is not None:
+            chunk = (chunk - self.scaler.mean_) / self.scaler.scale_
+        mean = getattr(self.projector, "mean_", None)
+        if mean is not None:
+            chunk = chunk - mean
+        return((chunk @ self.projector.components_.T).astype(np.float32))
+
+    @traced("project")
+    def project(self, X: np.ndarray) -> np.ndarray:
+        return(np.concatenate([self._project_chunk(chunk) for chunk in
+                               iter_flat_chunks(X, self.chunk_size)]))
+
+    @traced("fit")
+    def fit(self, X: np.ndarray, y: np.ndarray):
+        # the projection is computed once, chunked, and only to fit the LDA
+        self.lda.fit(self.project(X), np.asarray(y).reshape(-1))
+        return(self._fuse())
+
+    def _fuse(self):
+        # decision = ((x - mu) / sigma - m) @ C.T @ A.T + c
+        #          = x @ (M / sigma) + (c - (mu / sigma + m) @ M),  M = C.T @ A.T
+        chain = np.asarray(self.projector.components_, dtype=np.float64).T \
+            @ np.atleast_2d(self.lda.coef_).T
+        shift = getattr(self.projector, "mean_", None)
+        shift = np.zeros(chain.shape[0]) if shift is None else shift
+        weights = chain
+        if self.scaler is not None:
+            shift = shift + self.scaler.mean_ / self.scaler.scale_
+            weights = chain / self.scaler.scale_[:, None]
+        self.coef_ = weights.astype(np.float32)
+        self.intercept_ = (np.atleast_1d(self.lda.intercept_) - shift @ chain) \
+            .astype(np.float32)
+        return(self)
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        return(np.concatenate([chunk @ self.coef_ + self.intercept_ for chunk in
+                               iter_flat_chunks(X, self.chunk_size)]))
+
+    @traced("predict")
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        scores = self.decision_function(X)
+        if scores.shape[1] == 1:
+            # binary LDA: sigmoid of the single decision column
+            p = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return(np.column_stack([1.0 - p, p]).astype(np.float32))
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return(scores / scores.sum(axis=1, keepdims=True))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return(self.classes_[self.predict_proba(X).argmax(axis=1)])
+
+    def score(self, X: np.ndarray, y: np.ndarray) -> float:
+        return(float(np.mean(self.predict(X) == np.asarray(y).reshape(-1))))
@@ -0,0 +1,23 @@
+###############################################################################
+# Settings shared by the loaders, pipelines and models
+###############################################################################
+SEED = 1842
+INPUT_SHAPE = (32, 32, 3)
+BATCH_SIZE = 32
+STREAM_CHUNK = 4096  # rows per chunk when streaming memory-mapped arrays
+
+###############################################################################
+# Vehicle classes
+# CIFAR-10 labels kept by the loaders, in output order: label i of every
+# model is CIFAR10_LABELS[VEHICLE_CLASSES[i]].  Adding a class (e.g. 0 for
+# airplane) is a change here; heads and metrics follow NUM_CLASSES.
+# LABEL_NAMES are the names reported by /predict and the metrics; label 1
+# stays "car" as it always has.
+###############################################################################
+CIFAR10_LABELS = ("airplane", "automobile", "bird", "cat", "deer",
+                  "dog", "frog", "horse", "ship", "truck")
+LABEL_NAMES = ("airplane", "car", "bird", "cat", "deer",
+               "dog", "frog", "horse", "ship", "truck")
+VEHICLE_CLASSES = (1, 9)
+CLASS_NAMES = tuple(LABEL_NAMES[c] for c in VEHICLE_CLASSES)
+NUM_CLASSES = len(VEHICLE_CLASSES)
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from .config import CIFAR10_LABELS, SEED, VEHICLE_CLASSES
+from .instrumentation import traced
+
+###############################################################################
+# Raw CIFAR-10 with a Per-Class Index
+# The full CIFAR-10 arrays are saved once as .npy files next to a stable
+# argsort of the labels, so the rows of any class are one slice of that
+# order.  Building a subset is then a gather of its rows, with no scan over
+# all 60k images.
+###############################################################################
+DATA_CACHE_ROOT = Path.home() / ".keras" / "datasets"
+RAW_CACHE_DIR = DATA_CACHE_ROOT / "cifar10_raw"
+CACHE_VERSION = 2
+CACHE_ARRAYS = ("X_train", "y_train", "X_test", "y_test")
+
+def _sha256(path: Path, chunk_size: int=1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return(digest.hexdigest())
+
+def _atomic_save(path: Path, arr: np.ndarray):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(arr))
+    os.replace(tmp, path)
+
+def _raw_cifar10(cache_dir: Path=RAW_CACHE_DIR, mmap_mode: str="r"):
+    index_path = cache_dir / "class_index.npz"
+    if not index_path.exists():
+        from tensorflow import keras
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        (X_train, y_train), (X_test, y_test) = keras.datasets.cifar10.load_data()
+        index = {}
+        for split, X, y in (("train", X_train, y_train), ("test", X_test, y_test)):
+            _atomic_save(cache_dir / f"X_{split}.npy", X)
+            _atomic_save(cache_dir / f"y_{split}.npy", y)
+            labels = y.reshape(-1)
+            order = np.argsort(labels, kind="stable")
+            index[f"{split}_order"] = order
+            index[f"{split}_bounds"] = np.searchsorted(
+                labels[order], np.arange(len(CIFAR10_LABELS) + 1))
+        tmp = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **index)
+        os.replace(tmp, index_path)
+
+    arrays = {name: np.load(cache_dir / f"{name}.npy", mmap_mode=mmap_mode)
+              for name in CACHE_ARRAYS}
+    with np.load(index_path) as index:
+        return(arrays, dict(index))
+
+def class_indices(index: dict, split: str, classes) -> np.ndarray:
+    order, bounds = index[f"{split}_order"], index[f"{split}_bounds"]
+    # sorted, so the subset keeps CIFAR order and reads stay sequential
+    return(np.sort(np.concatenate(
+        [order[bounds[c]:bounds[c + 1]] for c in classes])))
+
+def label_lookup(classes) -> np.ndarray:
+    classes = list(classes)
+    if len(set(classes)) != len(classes) or \
+       not all(0 <= c < len(CIFAR10_LABELS) for c in classes):
+        raise ValueError(f"classes must be distinct CIFAR-10 labels 0-9, got {classes}")
+    lut = np.full(len(CIFAR10_LABELS), np.iinfo(np.uint8).max, dtype=np.uint8)
+    lut[classes] = np.arange(len(classes))
+    return(lut)
+
+###############################################################################
+# Load a CIFAR-10 Vehicle Subset
+# classes are CIFAR-10 labels in output order; one lookup-table pass maps
+# them to 0..len(classes)-1.
+###############################################################################
+@traced("filter")
+def cifar10_subset(classes=VEHICLE_CLASSES):
+    lut = label_lookup(classes)
+    arrays, index = _raw_cifar10()
+    subsets = []
+    for split in ("train", "test"):
+        idx = class_indices(index, split, classes)
+        subsets.append((np.asarray(arrays[f"X_{split}"][idx]),
+                        lut[arrays[f"y_{split}"][idx]]))
+    return(tuple(subsets))
+
+###############################################################################
+# Load CIFAR10 Cars and Trucks
+###############################################################################
+def cifar10_cars_trucks():
+    # Relabel car0 as 0 and truck1 as 1
+    cars0 = 1; trucks1 = 9
+    return(cifar10_subset((cars0, trucks1)))
+
+###############################################################################
+# Cached CIFAR10 Vehicle Subset
+# The filtered, relabelled uint8 arrays are written once per class list as
+# .npy files with a manifest of sha256 checksums.  Later runs memory-map
+# them read-only, so only the pages that are actually touched are read
+# from disk.
+###############################################################################
+def subset_cache_dir(classes=VEHICLE_CLASSES) -> Path:
+    return(DATA_CACHE_ROOT / ("cifar10_" + "_".join(CIFAR10_LABELS[c] for c in classes)))
+
+DATA_CACHE_DIR = subset_cache_dir(VEHICLE_CLASSES)
+
+def _write_cache(cache_dir: Path, classes=VEHICLE_CLASSES) -> dict:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    (X_train, y_train), (X_test, y_test) = cifar10_subset(classes)
+    arrays = dict(zip(CACHE_ARRAYS, (X_train, y_train, X_test, y_test)))
+
+    manifest = {"version": CACHE_VERSION, "classes": list(classes), "arrays": {}}
+    for name, arr in arrays.items():
+        path = cache_dir / f"{name}.npy"
+        _atomic_save(path, arr)
+        manifest["arrays"][name] = {
+            "sha256": _sha256(path),
+            "bytes": path.stat().st_size,
+            "shape": list(arr.shape),
+            "dtype": str(arr.dtype)}
+
+    tmp = cache_dir / f"manifest.json.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, cache_dir / "manifest.json")
+    return(manifest)
+
+def _read_manifest(cache_dir: Path, classes=VEHICLE_CLASSES, verify: bool=False):
+    manifest_path = cache_dir / "manifest.json"
+    if not manifest_path.exists():
+        return(None)
+    manifest = json.loads(manifest_path.read_text())
+    if manifest.get("version") != CACHE_VERSION or \
+       manifest.get("classes") != list(classes) or \
+       set(manifest.get("arrays", {})) != set(CACHE_ARRAYS):
+        return(None)
+    for name, meta in manifest["arrays"].items():
+        path = cache_dir / f"{name}.npy"
+        # size check is cheap; the full checksum is only recomputed on request
+        if not path.exists() or path.stat().st_size != meta["bytes"]:
+            return(None)
+        if verify and _sha256(path) != meta["sha256"]:
+            return(None)
+    return(manifest)
+
+@traced("load")
+def cifar10_subset_cached(classes=VEHICLE_CLASSES,
+                          cache_dir: Path=None,
+                          mmap_mode: str="r",
+                          verify: bool=False,
+                          refresh: bool=False):
+    cache_dir = Path(cache_dir or subset_cache_dir(classes))
+    manifest = None if refresh else \
+        _read_manifest(cache_dir, classes, verify=verify)
+    if manifest is None:
+        _write_cache(cache_dir, classes)
+
+    X_train, y_train, X_test, y_test = [
+        np.load(cache_dir / f"{name}.npy", mmap_mode=mmap_mode)
+        for name in CACHE_ARRAYS]
+    return( (X_train, y_train), (X_test, y_test) )
+
+def cifar10_cars_trucks_cached(cache_dir: Path=None, mmap_mode: str="r",
+                               verify: bool=False, refresh: bool=False):
+    return(cifar10_subset_cached((1, 9), cache_dir, mmap_mode, verify, refresh))
+
+###############################################################################
+# Train / Validation Split
+# Same tail slice keras takes for validation_split, returned as views.
+###############################################################################
+def train_val_split(X: np.ndarray, y: np.ndarray, validation_split: float=0.2):
+    split_at = int(np.ceil(len(X) * (1.0 - validation_split)))
+    return( (X[:split_at], y[:split_at]), (X[split_at:], y[split_at:]) )
+
+###############################################################################
+# Stratified Train / Validation Indices
+# Computed once per (validation_split, seed) and stored as sorted index
+# arrays beside the cached dataset, tagged with the y_train checksum so a
+# rebuilt cache gets a fresh split.  Every training entry point (notebook,
+# train, tune, distributed, benchmarks) reads the same indices, so
+# validation scores are comparable across models.
+###############################################################################
+def stratified_split(y: np.ndarray, validation_split: float=0.2, seed: int=SEED):
+    y = np.asarray(y).reshape(-1)
+    rng = np.random.default_rng(seed)
+    fit_idx, val_idx = [], []
+    for label in np.unique(y):
+        idx = np.flatnonzero(y == label)
+        rng.shuffle(idx)
+        n_val = int(round(len(idx) * validation_split))
+        val_idx.append(idx[:n_val])
+        fit_idx.append(idx[n_val:])
+    # sorted, so reads from the memory-mapped arrays stay sequential
+    return(np.sort(np.concatenate(fit_idx)), np.sort(np.concatenate(val_idx)))
+
+def split_indices(classes=VEHICLE_CLASSES, validation_split: float=0.2,
+                  seed: int=SEED, cache_dir: Path=None):
+    cache_dir = Path(cache_dir or subset_cache_dir(classes))
+    manifest = _read_manifest(cache_dir, classes) or _write_cache(cache_dir, classes)
+    labels_sha = manifest["arrays"]["y_train"]["sha256"]
+    path = cache_dir / f"split-{validation_split:g}-{seed}.npz"
+    if path.exists():
+        with np.load(path) as split:
+            if str(split["labels_sha256"]) == labels_sha:
+                return(split["fit_idx"], split["val_idx"])
+
+    y_train = np.load(cache_dir / "y_train.npy", mmap_mode="r")
+    fit_idx, val_idx = stratified_split(y_train, validation_split, seed)
+    # per-process temp name: local workers may build the split concurrently
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, fit_idx=fit_idx, val_idx=val_idx, labels_sha256=labels_sha)
+    os.replace(tmp, path)
+    return(fit_idx, val_idx)
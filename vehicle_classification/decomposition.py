@@ -0,0 +1,146 @@
+import time
+import warnings
+
+import numpy as np
+from sklearn.decomposition import IncrementalPCA, MiniBatchNMF, NMF, \
+    non_negative_factorization
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.preprocessing import StandardScaler
+
+from .config import SEED
+from .instrumentation import traced
+
+PCA_CHUNK = 2000
+
+###############################################################################
+# Flattened float32 chunks of an image array
+# Works on memory-mapped arrays, so only one chunk is ever resident.  A tail
+# shorter than min_tail rows is folded into the last full chunk.
+###############################################################################
+def iter_flat_chunks(X: np.ndarray, chunk_size: int=PCA_CHUNK, min_tail: int=0):
+    n, start = len(X), 0
+    while start < n:
+        stop = start + chunk_size
+        if n - stop < min_tail:
+            stop = n
+        chunk = np.asarray(X[start:stop])
+        yield chunk.reshape(len(chunk), -1).astype(np.float32)
+        start = stop
+
+###############################################################################
+# Out-of-core PCA
+# Two streaming passes: the first accumulates the StandardScaler mean and
+# variance, the second feeds scaled chunks to IncrementalPCA.  Only the
+# scaler statistics and the component matrix are kept in memory.
+###############################################################################
+@traced("fit")
+def fit_streaming_pca(X: np.ndarray, n_components: int=180,
+                      chunk_size: int=PCA_CHUNK, standardize: bool=True):
+    # every partial_fit batch needs at least n_components rows
+    chunk_size = max(chunk_size, n_components)
+    scaler = None
+    if standardize:
+        scaler = StandardScaler()
+        for chunk in iter_flat_chunks(X, chunk_size):
+            scaler.partial_fit(chunk)
+
+    ipca = IncrementalPCA(n_components=n_components, batch_size=chunk_size)
+    for chunk in iter_flat_chunks(X, chunk_size, min_tail=n_components):
+        if scaler is not None:
+            chunk = scaler.transform(chunk)
+        ipca.partial_fit(chunk)
+    return(scaler, ipca)
+
+###############################################################################
+# Number of components needed to explain a share of the variance
+###############################################################################
+def n_components_for_variance(model, threshold: float=0.9) -> int:
+    cumulative = np.cumsum(model.explained_variance_ratio_)
+    if cumulative[-1] < threshold:
+        return(None)
+    return(int(np.searchsorted(cumulative, threshold) + 1))
+
+###############################################################################
+# NMF Engines
+#   cd         NMF, coordinate descent (the notebook's original solver)
+#   mu         NMF, multiplicative updates
+#   minibatch  MiniBatchNMF, multiplicative updates on mini-batches
+# fit_nmf() runs in float32 with NNDSVDa initialisation by default and can
+# warm start from a previously fitted components_ matrix, so a refresh on
+# new data starts close to the old solution instead of from scratch.
+###############################################################################
+NMF_BACKENDS = ("cd", "mu", "minibatch")
+
+def make_nmf(backend: str="mu", n_components: int=100, init: str="nndsvda",
+             max_iter: int=500, tol: float=5e-3, batch_size: int=1024,
+             random_state: int=SEED):
+    if backend == "minibatch":
+        return(MiniBatchNMF(n_components=n_components, init=init,
+                            max_iter=max_iter, tol=tol, batch_size=batch_size,
+                            random_state=random_state))
+    if backend in ("cd", "mu"):
+        return(NMF(n_components=n_components, init=init, solver=backend,
+                   max_iter=max_iter, tol=tol, random_state=random_state))
+    raise ValueError(f"backend must be one of {NMF_BACKENDS}")
+
+def warm_start_factors(X: np.ndarray, components: np.ndarray):
+    # solve for W with H held fixed, giving a consistent custom init
+    H = np.asarray(components, dtype=X.dtype)
+    W, _, _ = non_negative_factorization(
+        X, H=H, n_components=H.shape[0], update_H=False)
+    return(W, H)
+
+@traced("fit")
+def fit_nmf(X: np.ndarray, backend: str="mu", warm_start: np.ndarray=None,
+            dtype=np.float32, **kwargs):
+    X = np.asarray(X, dtype=dtype)
+    if warm_start is None:
+        return(make_nmf(backend, **kwargs).fit(X))
+    kwargs.update(n_components=warm_start.shape[0], init="custom")
+    W, H = warm_start_factors(X, warm_start)
+    return(make_nmf(backend, **kwargs).fit(X, W=W, H=H))
+
+###############################################################################
+# NMF Time-to-Error Benchmark
+# Fits in steps of step_iter iterations, warm starting each step from the
+# last, and records (elapsed seconds, iterations, reconstruction error).
+###############################################################################
+def nmf_error_curve(X: np.ndarray, backend: str="mu", step_iter: int=25,
+                    max_iter: int=500, dtype=np.float32, **kwargs) -> list:
+    X = np.asarray(X, dtype=dtype)
+    curve, elapsed, n_iter, W, H = [], 0.0, 0, None, None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        while n_iter < max_iter:
+            est = make_nmf(backend, max_iter=step_iter, **kwargs)
+            start = time.perf_counter()
+            if W is None:
+                W = est.fit_transform(X)
+            else:
+                est.set_params(init="custom")
+                W = est.fit_transform(X, W=W, H=H)
+            elapsed += time.perf_counter() - start
+            H = est.components_
+            n_iter += est.n_iter_
+            curve.append((elapsed, n_iter, float(est.reconstruction_err_)))
+            if est.n_iter_ < step_iter:
+                break  # converged within tol
+    return(curve)
+
+def time_to_error(curve: list, target_err: float) -> float:
+    for elapsed, _, err in curve:
+        if err <= target_err:
+            return(elapsed)
+    return(None)
+
+def benchmark_nmf(X: np.ndarray, engines: dict, target_err: float,
+                  **kwargs) -> list:
+    rows = []
+    for label, config in engines.items():
+        curve = nmf_error_curve(X, **{**kwargs, **config})
+        total, n_iter, err = curve[-1]
+        reached = time_to_error(curve, target_err)
+        rows.append([label,
+                     None if reached is None else round(reached, 2),
+                     round(total, 2), n_iter, round(err, 2)])
+    return(rows)
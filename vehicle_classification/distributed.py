@@ -0,0 +1,204 @@
+###############################################################################
+# Data-Parallel Multi-Worker Training
+#
+#   python -m vehicle_classification.distributed --workers 4 --epochs 10
+#   python -m vehicle_classification.distributed --workers 1 2 4 --epochs 3
+#
+# build_model is trained under tf.distribute.MultiWorkerMirroredStrategy.
+# The launcher starts one process per worker on localhost (each with its
+# own TF_CONFIG, core slice and thread count, as in tuning.py); on a real
+# cluster start the same command on every node with --role worker and a
+# TF_CONFIG listing all nodes.
+#
+# Sharding happens in the input pipeline: worker i reads only its own
+# contiguous block of the training and validation indices
+# (make_dataset(shard=...)) and tf.data auto-sharding is switched off.  The
+# per-replica batch stays at --batch-size, so the global batch grows with
+# the number of workers.
+#
+# Passing several worker counts runs each in turn with the same cores per
+# worker and reports throughput, speedup and scaling efficiency relative
+# to the smallest count.
+###############################################################################
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from .config import BATCH_SIZE, SEED
+from .tuning import _available_cores, _core_slices, pin_threads
+
+BASE_PORT = 12345
+WORKER_HOST = "127.0.0.1"
+
+###############################################################################
+# Worker
+###############################################################################
+def _cluster() -> tuple:
+    tf_config = json.loads(os.environ.get("TF_CONFIG", "{}"))
+    workers = tf_config.get("cluster", {}).get("worker", [WORKER_HOST])
+    return(len(workers), tf_config.get("task", {}).get("index", 0))
+
+def train_worker(epochs: int=10, batch_size: int=BATCH_SIZE, seed: int=SEED,
+                 fast: bool=False, output: Path=None, verbose=0) -> dict:
+    import tensorflow as tf
+
+    from .benchmarks import epoch_timer
+    from .data import cifar10_subset_cached, split_indices
+    from .models import build_model
+    from .pipeline import make_dataset
+    from .preprocessing import MinMaxImageScaler
+    from .serving import save_class_names
+
+    n_workers, index = _cluster()
+    chief = index == 0
+    strategy = tf.distribute.MultiWorkerMirroredStrategy(
+        communication_options=tf.distribute.experimental.CommunicationOptions(
+            implementation=tf.distribute.experimental.CommunicationImplementation.RING))
+    tf.keras.utils.set_random_seed(seed)
+
+    (X_train, y_train), _ = cifar10_subset_cached()
+    fit_idx, val_idx = split_indices()
+    # every worker fits the scaler on the full split, so the fused layer
+    # is identical across replicas
+    scaler = MinMaxImageScaler(per_channel=True).fit(X_train, indices=fit_idx)
+
+    global_batch = batch_size * strategy.num_replicas_in_sync
+    shard = (n_workers, index)
+    train_ds = make_dataset(X_train, y_train, batch_size=global_batch,
+                            shuffle=True, seed=seed + index, cache="",
+                            shard=shard, indices=fit_idx)
+    val_ds = make_dataset(X_train, y_train, batch_size=global_batch, cache="",
+                          shard=shard, indices=val_idx)
+
+    with strategy.scope():
+        model = build_model(scaler, fast=fast)
+    timer = epoch_timer()
+    history = model.fit(train_ds, epochs=epochs, validation_data=val_ds,
+                        callbacks=[timer], verbose=verbose if chief else 0)
+
+    if output is not None:
+        # every worker must take part in saving; only the chief's copy is kept
+        path = Path(output) if chief else \
+            Path(tempfile.mkdtemp(prefix=f"worker{index}-"))
+        model.save(path)
+        if chief:
+            save_class_names(path)
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+
+    epoch_time = timer.steady_epoch_time()
+    n_samples = (len(fit_idx) // n_workers) * n_workers
+    return({
+        "workers": n_workers,
+        "global_batch": global_batch,
+        "epochs": epochs,
+        "epoch_time_s": round(epoch_time, 4),
+        "samples_per_s": round(n_samples / epoch_time, 1),
+        "val_accuracy": round(float(history.history["val_accuracy"][-1]), 4)})
+
+def run_worker(args):
+    pin_threads(args.threads)
+    report = train_worker(epochs=args.epochs, batch_size=args.batch_size,
+                          seed=args.seed, fast=args.fast, output=args.output,
+                          verbose=2)
+    if _cluster()[1] == 0 and args.report is not None:
+        args.report.write_text(json.dumps(report))
+    return(report)
+
+###############################################################################
+# Launcher
+###############################################################################
+def _tf_config(n_workers: int, index: int, port: int) -> str:
+    return(json.dumps({
+        "cluster": {"worker": [f"{WORKER_HOST}:{port + i}" for i in range(n_workers)]},
+        "task": {"type": "worker", "index": index}}))
+
+def _worker_argv(args, report: Path) -> list:
+    argv = ["--epochs", str(args.epochs), "--batch-size", str(args.batch_size),
+            "--seed", str(args.seed), "--report", str(report)]
+    if args.fast:
+        argv.append("--fast")
+    if args.output is not None:
+        argv += ["--output", str(args.output)]
+    return(argv)
+
+def launch(args, n_workers: int) -> dict:
+    slices = _core_slices(_available_cores(), max(args.workers))[:n_workers]
+    with tempfile.TemporaryDirectory() as tmp:
+        report = Path(tmp) / "report.json"
+        procs = []
+        for index, cores in enumerate(slices):
+            env = dict(os.environ)
+            env.update({
+                "TF_CONFIG": _tf_config(n_workers, index, args.port),
+                "OMP_NUM_THREADS": str(len(cores)),
+                "TF_NUM_INTRAOP_THREADS": str(len(cores)),
+                "TF_CPP_MIN_LOG_LEVEL": env.get("TF_CPP_MIN_LOG_LEVEL", "2")})
+            pin = None
+            if hasattr(os, "sched_setaffinity"):
+                pin = lambda cores=cores: os.sched_setaffinity(0, cores)
+            procs.append(subprocess.Popen(
+                [sys.executable, "-m", "vehicle_classification.distributed",
+                 *_worker_argv(args, report), "--role", "worker",
+                 "--threads", str(len(cores))],
+                env=env, preexec_fn=pin))
+        try:
+            codes = [p.wait() for p in procs]
+        except KeyboardInterrupt:
+            for p in procs:
+                p.terminate()
+            for p in procs:
+                p.wait()
+            raise
+        if max(codes) != 0:
+            raise RuntimeError(f"{n_workers}-worker run failed with exit codes {codes}")
+        return(json.loads(report.read_text()))
+
+def scaling_report(rows: list) -> list:
+    base = rows[0]
+    for row in rows:
+        speedup = row["samples_per_s"] / base["samples_per_s"]
+        row["speedup"] = round(speedup, 3)
+        row["efficiency"] = round(speedup * base["workers"] / row["workers"], 3)
+    return(rows)
+
+###############################################################################
+# Command Line
+###############################################################################
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Multi-worker data-parallel training for build_model")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2],
+                        help="worker counts; several report scaling efficiency")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="per-replica batch size")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--fast", action="store_true",
+                        help="XLA, steps_per_execution and mixed bfloat16")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="save the trained model (chief only)")
+    parser.add_argument("--port", type=int, default=BASE_PORT)
+    parser.add_argument("--report", type=Path, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--role", choices=("launcher", "worker"), default="launcher",
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1,
+                        help=argparse.SUPPRESS)
+    return(parser)
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.role == "worker":
+        run_worker(args)
+        return(0)
+    rows = [launch(args, n) for n in sorted(set(args.workers))]
+    print(json.dumps(scaling_report(rows), indent=2))
+    return(0)
+
+if __name__ == "__main__":
+    sys.exit(main())
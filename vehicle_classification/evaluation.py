@@ -0,0 +1,37 @@
+import numpy as np
+import tensorflow as tf
+
+from .config import INPUT_SHAPE, NUM_CLASSES
+from .instrumentation import traced
+from .metrics import StreamingEvaluation
+
+###############################################################################
+# Streaming Evaluation Runner
+# Each batch of the dataset is read once and passed through every model;
+# only the per-model confusion matrices and ROC histograms are kept, so
+# comparing N models costs one pass and constant memory.
+###############################################################################
+def _forward_fn(model):
+    if isinstance(model, tf.keras.Model):
+        signature = tf.TensorSpec(shape=(None,) + INPUT_SHAPE, dtype=tf.float32)
+        return(tf.function(lambda x: model(x, training=False),
+                           input_signature=[signature]))
+    # any callable mapping a batch of images to class probabilities
+    return(model)
+
+def _labels(y) -> np.ndarray:
+    y = np.asarray(y)
+    return(y.argmax(axis=1) if y.ndim == 2 and y.shape[1] > 1 else y.reshape(-1))
+
+@traced("evaluate")
+def evaluate_models(models: dict, dataset, num_classes: int=NUM_CLASSES,
+                    positive: int=1, bins: int=1000) -> dict:
+    forwards = {name: _forward_fn(model) for name, model in models.items()}
+    evaluations = {name: StreamingEvaluation(num_classes, positive, bins)
+                   for name in models}
+    for x, y in dataset:
+        y_true = _labels(y)
+        for name, forward in forwards.items():
+            probs = forward(x)
+            evaluations[name].update(y_true, np.asarray(probs))
+    return(evaluations)
@@ -0,0 +1,82 @@
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+
+from .config import SEED
+from .instrumentation import traced
+from .metrics import get_metrics
+from .pipeline import make_dataset
+from .serving import save_class_names, tflite_interpreter
+
+###############################################################################
+# TFLite Export | float32, dynamic-range or full int8 quantisation
+# int8 calibration draws a fixed-seed sample of the training images.  The
+# fused scaler means the quantised model takes raw uint8 pixels directly.
+###############################################################################
+TFLITE_QUANTIZE = ("none", "dynamic", "int8")
+
+def representative_dataset(X: np.ndarray, n_samples: int=500, seed: int=SEED):
+    rng = np.random.default_rng(seed)
+    idx = np.sort(rng.choice(len(X), size=min(n_samples, len(X)), replace=False))
+    def gen():
+        for i in idx:
+            yield [np.asarray(X[i:i + 1], dtype=np.float32)]
+    return(gen)
+
+def export_tflite(model, path: Path, quantize: str="none",
+                  X_calib: np.ndarray=None, n_calib: int=500,
+                  classes: tuple=None) -> Path:
+    if quantize not in TFLITE_QUANTIZE:
+        raise ValueError(f"quantize must be one of {TFLITE_QUANTIZE}")
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize != "none":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantize == "int8":
+        if X_calib is None:
+            raise ValueError("int8 quantisation needs calibration images")
+        converter.representative_dataset = \
+            representative_dataset(X_calib, n_samples=n_calib)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.uint8
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(converter.convert())
+    if classes is not None:
+        save_class_names(path, classes)
+    return(path)
+
+@traced("predict")
+def tflite_predict(path: Path, X: np.ndarray, batch_size: int=256) -> np.ndarray:
+    interpreter = tflite_interpreter(path)
+    inp = interpreter.get_input_details()[0]
+    out = interpreter.get_output_details()[0]
+    in_scale, in_zero = inp["quantization"]
+    out_scale, out_zero = out["quantization"]
+
+    probs, shape = [], None
+    for start in range(0, len(X), batch_size):
+        x = np.asarray(X[start:start + batch_size], dtype=np.float32)
+        if x.shape != shape:
+            shape = x.shape
+            interpreter.resize_tensor_input(inp["index"], shape)
+            interpreter.allocate_tensors()
+        if in_scale:
+            x = np.round(x / in_scale + in_zero)
+        interpreter.set_tensor(inp["index"], x.astype(inp["dtype"]))
+        interpreter.invoke()
+        y = interpreter.get_tensor(out["index"]).astype(np.float32)
+        if out_scale:
+            y = (y - out_zero) * out_scale
+        probs.append(y)
+    return(np.concatenate(probs))
+
+def compare_tflite(model, paths: dict, X: np.ndarray, y_true: np.ndarray) -> dict:
+    y_true = np.asarray(y_true).reshape(-1)
+    results = {"keras": np.array(
+        get_metrics(y_true, model.predict(make_dataset(X)).argmax(axis=1)))}
+    for label, path in paths.items():
+        preds = tflite_predict(path, X).argmax(axis=1)
+        results[label] = np.array(get_metrics(y_true, preds))
+        results[f"{label} delta"] = results[label] - results["keras"]
+    return(results)
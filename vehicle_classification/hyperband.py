@@ -0,0 +1,132 @@
+import copy
+
+import numpy as np
+from keras import Sequential
+from keras.layers import Conv2D, Dense, Dropout, Flatten, MaxPool2D
+from keras_tuner import HyperModel
+from keras_tuner.engine import tuner_utils
+from keras_tuner.tuners import Hyperband
+from tensorflow import keras
+
+from .models import input_layers
+
+###############################################################################
+# CNN Hypermodel Prototype
+###############################################################################
+class CarTruckCNN(HyperModel):
+    def __init__(self, input_shape, num_classes, scaler=None):
+        self.input_shape = input_shape
+        self.num_classes = num_classes
+        self.scaler = scaler
+
+    def build(self, hp):
+        model = Sequential(input_layers(self.scaler))
+        model.add(Conv2D(32, (3,3), activation="relu"))
+        model.add(MaxPool2D(pool_size=(2,2)))
+        model.add(Dropout(rate=hp.Float(
+            'dropout_1', min_value=0.0, max_value=0.5,default=0.25,step=0.05,)))
+        model.add(Dropout(rate=0.05))
+        model.add(Conv2D(32, (3,3)))
+        model.add(MaxPool2D(pool_size=(2,2)))
+        model.add(Dropout(rate=hp.Float(
+            'dropout_2',min_value=0.0,max_value=0.5,default=0.25,step=0.05,)))
+        model.add(Flatten())
+        model.add(keras.layers.Dense(
+            hp.Choice('units_1', [2048, 1024]), activation='relu'))
+        model.add(Dense(hp.Choice('units_2', [512, 256]), activation="relu"))
+        model.add(Dense(hp.Choice('units_3', [256, 128]), activation="relu"))
+        model.add(Dense(self.num_classes, activation="softmax"))
+
+        model.compile(
+            optimizer="adam", 
+            loss="categorical_crossentropy", 
+            metrics=["accuracy"])
+        return(model)
+
+
+###############################################################################
+# Hyperband with Early Pruning of Repeated Executions
+#
+# executions_per_trial trains every configuration several times to average
+# away seed noise.  After min_executions runs, the remaining executions are
+# skipped when the trial's optimistic score (mean plus the larger of the
+# spread and prune_margin) still falls short of the best completed trial
+# in the same bracket and round.  Promising configurations keep every
+# execution; clear losers stop early.
+###############################################################################
+class PrunedHyperband(Hyperband):
+    def __init__(self, hypermodel=None, min_executions: int=2,
+                 prune_margin: float=0.02, **kwargs):
+        super().__init__(hypermodel, **kwargs)
+        self.min_executions = min_executions
+        self.prune_margin = prune_margin
+        self.pruned_executions = 0
+
+    def _objective_value(self, result) -> float:
+        objective = self.oracle.objective
+        if result is None:
+            return(None)
+        history = getattr(result, "history", result)
+        if isinstance(history, dict):
+            values = history.get(objective.name)
+            if values is None:
+                return(None)
+            values = np.atleast_1d(values)
+            return(float(values.max() if objective.direction == "max"
+                         else values.min()))
+        return(float(history))
+
+    def _bracket_leader(self, trial) -> float:
+        hps = trial.hyperparameters.values
+        key = (hps.get("tuner/bracket"), hps.get("tuner/round"))
+        # get_best_trials works for both the local and the chief (gRPC) oracle
+        for best in self.oracle.get_best_trials(num_trials=10_000):
+            best_hps = best.hyperparameters.values
+            if (best_hps.get("tuner/bracket"), best_hps.get("tuner/round")) == key \
+               and best.score is not None:
+                return(float(best.score))
+        return(None)
+
+    def _should_prune(self, trial, scores: list) -> bool:
+        if len(scores) < self.min_executions or None in scores:
+            return(False)
+        leader = self._bracket_leader(trial)
+        if leader is None:
+            return(False)
+        slack = max(self.prune_margin, float(np.std(scores)))
+        if self.oracle.objective.direction == "max":
+            return(np.mean(scores) + slack < leader)
+        return(np.mean(scores) - slack > leader)
+
+    def run_trial(self, trial, *args, **kwargs):
+        # Tuner.run_trial (with Hyperband's epoch bookkeeping) plus a prune
+        # check after every execution.  One SaveBestEpoch is shared by all
+        # executions, so the trial checkpoint that Hyperband warm-starts from
+        # and get_best_models loads is the best epoch of any execution.
+        hp = trial.hyperparameters
+        if "tuner/epochs" in hp.values:
+            kwargs["epochs"] = hp.values["tuner/epochs"]
+            kwargs["initial_epoch"] = hp.values["tuner/initial_epoch"]
+        model_checkpoint = tuner_utils.SaveBestEpoch(
+            objective=self.oracle.objective,
+            filepath=self._get_checkpoint_fname(trial.trial_id))
+        original_callbacks = kwargs.pop("callbacks", [])
+
+        executions = self.executions_per_trial
+        histories, scores = [], []
+        for execution in range(executions):
+            copied_kwargs = copy.copy(kwargs)
+            callbacks = self._deepcopy_callbacks(original_callbacks)
+            self._configure_tensorboard_dir(callbacks, trial, execution)
+            if hasattr(tuner_utils, "TunerCallback"):
+                # keras_tuner < 1.3 reports epochs through this callback
+                callbacks.append(tuner_utils.TunerCallback(self, trial))
+            callbacks.append(model_checkpoint)
+            copied_kwargs["callbacks"] = callbacks
+            result = self._build_and_fit_model(trial, *args, **copied_kwargs)
+            histories.append(result)
+            scores.append(self._objective_value(result))
+            if execution + 1 < executions and self._should_prune(trial, scores):
+                self.pruned_executions += executions - execution - 1
+                break
+        return(histories)
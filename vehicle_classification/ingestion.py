@@ -0,0 +1,393 @@
+###############################################################################
+# Live Frame Ingestion | toll-camera lanes -> classifier
+#
+# Frames arrive continuously from many lanes.  Each lane has its own
+# bounded queue; a per-lane task decodes and resizes frames to the 32x32x3
+# input of build_model on a bounded thread pool, and one classifier task
+# batches decoded frames (up to --max-batch or --max-wait-ms, as the
+# MicroBatcher in serving.py does) for a single forward pass.
+#
+# Backpressure: the decoded-frame queue is bounded, so a slow classifier
+# stalls the lane tasks, the lane queues fill up and submit() then sheds
+# load by policy:
+#
+#   drop-oldest   discard the oldest queued frame of that lane (default;
+#                 a live camera only cares about the latest vehicles)
+#   drop-newest   discard the incoming frame
+#   block         make the producer wait (replays and offline sources)
+#
+# report() gives, per lane, frames queued / dropped / classified, current
+# and peak queue depth and capture-to-result latency.
+#
+#   python -m vehicle_classification ingest --model models/car_truck_cnn \
+#       --lanes 8 --rate 30 --seconds 20 --frame-size 128 --encode jpeg
+#
+# The ingest subcommand replays CIFAR-10 test images as synthetic camera
+# streams at --rate frames/sec per lane.  Only numpy is imported up front;
+# Pillow is needed for encoded (PNG / JPEG) frames.
+###############################################################################
+import argparse
+import asyncio
+import io
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .config import INPUT_SHAPE, SEED
+from .instrumentation import TRACER
+
+POLICIES = ("drop-oldest", "drop-newest", "block")
+
+###############################################################################
+# Frames and Decoding
+###############################################################################
+@dataclass
+class Frame:
+    lane: int
+    seq: int
+    data: object  # encoded image bytes or an HxW[xC] uint8 array
+    captured: float = field(default_factory=time.perf_counter)
+
+def resize_frame(image: np.ndarray) -> np.ndarray:
+    height, width, channels = INPUT_SHAPE
+    image = np.asarray(image, dtype=np.uint8)
+    if image.ndim == 2:
+        image = image[..., None]
+    if image.shape[2] == 1:
+        image = np.repeat(image, channels, axis=2)
+    image = image[..., :channels]
+    h, w = image.shape[:2]
+    if (h, w) == (height, width):
+        return(image)
+    if h % height == 0 and w % width == 0:
+        # whole-number downscale: average each block
+        blocks = image.reshape(height, h // height, width, w // width, channels)
+        return(blocks.mean(axis=(1, 3)).round().astype(np.uint8))
+    rows = (np.arange(height) * h // height)[:, None]
+    cols = (np.arange(width) * w // width)[None, :]
+    return(image[rows, cols])
+
+def decode_frame(data) -> np.ndarray:
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        return(resize_frame(data))
+    from PIL import Image
+
+    height, width, _ = INPUT_SHAPE
+    image = Image.open(io.BytesIO(data))
+    # JPEG: let the decoder scale down by a power of two first
+    image.draft("RGB", (width, height))
+    image = image.convert("RGB")
+    if image.size != (width, height):
+        image = image.resize((width, height), Image.BILINEAR)
+    return(np.asarray(image, dtype=np.uint8))
+
+###############################################################################
+# Per-Lane Statistics
+###############################################################################
+class LaneStats:
+    def __init__(self, window: int=10_000):
+        self.queued = 0
+        self.dropped = 0
+        self.classified = 0
+        self.max_depth = 0
+        self._latencies = deque(maxlen=window)
+
+    def record(self, latency_s: float):
+        self.classified += 1
+        self._latencies.append(latency_s)
+
+    def summary(self, depth: int=0) -> dict:
+        lat = np.array(self._latencies) * 1000.0
+        p50, p99 = np.percentile(lat, [50, 99]) if len(lat) else (0.0, 0.0)
+        return({
+            "queued": self.queued,
+            "dropped": self.dropped,
+            "classified": self.classified,
+            "depth": depth,
+            "max_depth": self.max_depth,
+            "p50_ms": round(float(p50), 3),
+            "p99_ms": round(float(p99), 3)})
+
+###############################################################################
+# Ingestion Pipeline
+###############################################################################
+class IngestionPipeline:
+    def __init__(self, predict_fn, lanes: int, max_queue: int=64,
+                 max_batch: int=32, max_wait_ms: float=10.0,
+                 decode_workers: int=4, policy: str="drop-oldest",
+                 on_result=None):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.policy = policy
+        self.on_result = on_result
+        self.stats = [LaneStats() for _ in range(lanes)]
+        self._max_queue = max_queue
+        self._decode_pool = ThreadPoolExecutor(decode_workers,
+                                               thread_name_prefix="decode")
+        self._classify_pool = ThreadPoolExecutor(1, thread_name_prefix="classify")
+        self._started = None
+        self._tasks = []
+
+    async def start(self):
+        # queues are created here so they bind to the running loop
+        self._lanes = [asyncio.Queue(self._max_queue) for _ in self.stats]
+        self._decoded = asyncio.Queue(2 * self.max_batch)
+        self._tasks = [asyncio.create_task(self._decode_lane(lane))
+                       for lane in range(len(self.stats))]
+        self._classifier = asyncio.create_task(self._classify())
+        self._started = time.perf_counter()
+        return(self)
+
+    def _raise_if_stopped(self):
+        if self._classifier.done():
+            # re-raises the classifier's error (e.g. from on_result)
+            self._classifier.result()
+            raise RuntimeError("the classifier task has stopped")
+
+    async def _guard(self, aw):
+        # await aw unless the classifier dies first; nothing would drain the
+        # queues after that, so waiting on them would hang
+        task = asyncio.ensure_future(aw)
+        await asyncio.wait({task, self._classifier},
+                           return_when=asyncio.FIRST_COMPLETED)
+        if not task.done():
+            task.cancel()
+            self._raise_if_stopped()
+        return(task.result())
+
+    async def submit(self, frame: Frame) -> bool:
+        self._raise_if_stopped()
+        lane, stats = self._lanes[frame.lane], self.stats[frame.lane]
+        if self.policy == "block":
+            await self._guard(lane.put(frame))
+        elif lane.full():
+            stats.dropped += 1
+            TRACER.count("ingest.dropped")
+            if self.policy == "drop-newest":
+                return(False)
+            lane.get_nowait()
+            lane.put_nowait(frame)
+        else:
+            lane.put_nowait(frame)
+        stats.queued += 1
+        stats.max_depth = max(stats.max_depth, lane.qsize())
+        return(True)
+
+    async def close(self):
+        # drain: every lane finishes its queue before the classifier stops
+        try:
+            for lane in self._lanes:
+                await self._guard(lane.put(None))
+            await self._guard(asyncio.gather(*self._tasks))
+            await self._guard(self._decoded.put(None))
+            await self._classifier
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            self._decode_pool.shutdown()
+            self._classify_pool.shutdown()
+
+    async def __aenter__(self):
+        return(await self.start())
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @staticmethod
+    def _decode(frame: Frame) -> np.ndarray:
+        with TRACER.span("decode", lane=frame.lane):
+            return(decode_frame(frame.data))
+
+    def _predict(self, images: np.ndarray) -> np.ndarray:
+        with TRACER.span("predict", batch=len(images)):
+            probs = self.predict_fn(images)
+        TRACER.count("predict.images", len(images))
+        return(np.asarray(probs))
+
+    async def _decode_lane(self, lane: int):
+        # one decode in flight per lane keeps frame order and bounds the
+        # thread pool's backlog to the number of lanes
+        loop = asyncio.get_running_loop()
+        queue = self._lanes[lane]
+        while True:
+            frame = await queue.get()
+            if frame is None:
+                return
+            try:
+                image = await loop.run_in_executor(
+                    self._decode_pool, self._decode, frame)
+            except Exception:
+                self.stats[lane].dropped += 1
+                TRACER.count("ingest.decode_errors")
+                continue
+            await self._decoded.put((frame, image))
+
+    async def _collect(self, first) -> tuple:
+        loop = asyncio.get_running_loop()
+        batch, stop = [first], False
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._decoded.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+        return(batch, stop)
+
+    async def _classify(self):
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            first = await self._decoded.get()
+            if first is None:
+                return
+            batch, stop = await self._collect(first)
+            images = np.stack([image for _, image in batch])
+            try:
+                probs = await loop.run_in_executor(
+                    self._classify_pool, self._predict, images)
+            except Exception:
+                # keep draining so the lanes never stall behind a failed batch
+                for frame, _ in batch:
+                    self.stats[frame.lane].dropped += 1
+                TRACER.count("ingest.predict_errors")
+                continue
+            done = time.perf_counter()
+            for (frame, _), p in zip(batch, probs):
+                self.stats[frame.lane].record(done - frame.captured)
+                if self.on_result is not None:
+                    self.on_result(frame, p)
+
+    def report(self) -> dict:
+        elapsed = time.perf_counter() - self._started
+        lanes = {lane: stats.summary(self._lanes[lane].qsize())
+                 for lane, stats in enumerate(self.stats)}
+        classified = sum(row["classified"] for row in lanes.values())
+        return({
+            "lanes": lanes,
+            "queued": sum(row["queued"] for row in lanes.values()),
+            "dropped": sum(row["dropped"] for row in lanes.values()),
+            "classified": classified,
+            "throughput_fps": round(classified / elapsed, 2) if elapsed else 0.0})
+
+###############################################################################
+# Synthetic Camera Streams
+# Each lane replays randomly drawn test images at a fixed rate.  Frames are
+# optionally upscaled to a camera-like resolution and PNG / JPEG encoded so
+# the decode and resize stage does real work.  Send times are absolute
+# (start + seq / rate), so a producer held up by backpressure catches up
+# rather than drifting.
+###############################################################################
+def synthesize_frame(image: np.ndarray, frame_size: int=None,
+                     encode: str=None):
+    if frame_size:
+        scale = -(-frame_size // image.shape[0])
+        image = np.repeat(np.repeat(image, scale, axis=0), scale, axis=1)
+        image = image[:frame_size, :frame_size]
+    if not encode:
+        return(np.ascontiguousarray(image))
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.fromarray(np.asarray(image)).save(buffer, format=encode.upper())
+    return(buffer.getvalue())
+
+async def replay_frames(images: np.ndarray, lane: int, rate: float,
+                        seconds: float=None, n_frames: int=None,
+                        frame_size: int=None, encode: str=None,
+                        seed: int=SEED):
+    rng = np.random.default_rng([seed, lane])
+    loop = asyncio.get_running_loop()
+    start, interval, seq = loop.time(), 1.0 / rate, 0
+    while (n_frames is None or seq < n_frames) and \
+          (seconds is None or seq * interval < seconds):
+        delay = start + seq * interval - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        image = images[rng.integers(len(images))]
+        yield Frame(lane, seq, synthesize_frame(image, frame_size, encode))
+        seq += 1
+
+async def replay(pipeline: IngestionPipeline, images: np.ndarray, rate: float,
+                 seconds: float=None, n_frames: int=None, frame_size: int=None,
+                 encode: str=None, seed: int=SEED) -> dict:
+    async def feed(lane: int):
+        async for frame in replay_frames(images, lane, rate, seconds, n_frames,
+                                         frame_size, encode, seed):
+            await pipeline.submit(frame)
+
+    async with pipeline:
+        await asyncio.gather(*(feed(lane) for lane in range(len(pipeline.stats))))
+    return(pipeline.report())
+
+###############################################################################
+# Command Line
+###############################################################################
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m vehicle_classification ingest",
+        description="Classify synthetic camera lanes replaying CIFAR test images")
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--lanes", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=30.0,
+                        help="frames per second per lane")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--frame-size", type=int, default=None,
+                        help="upscale frames to this many pixels square")
+    parser.add_argument("--encode", choices=("png", "jpeg"), default=None)
+    parser.add_argument("--policy", choices=POLICIES, default="drop-oldest")
+    parser.add_argument("--max-queue", type=int, default=64,
+                        help="frames buffered per lane")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--decode-workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=SEED)
+    return(parser)
+
+def run(args) -> int:
+    from .data import cifar10_subset_cached
+    from .serving import load_predict_fn
+
+    _, (X_test, _) = cifar10_subset_cached()
+    images = np.asarray(X_test)
+    predict_fn = load_predict_fn(args.model, args.max_batch)
+    classes = None
+
+    def count_class(frame: Frame, probs: np.ndarray):
+        nonlocal classes
+        if classes is None:
+            classes = np.zeros(probs.shape[-1], dtype=np.int64)
+        classes[probs.argmax()] += 1
+
+    pipeline = IngestionPipeline(
+        predict_fn, lanes=args.lanes,
+        max_queue=args.max_queue, max_batch=args.max_batch,
+        max_wait_ms=args.max_wait_ms, decode_workers=args.decode_workers,
+        policy=args.policy, on_result=count_class)
+    report = asyncio.run(replay(pipeline, images, args.rate, seconds=args.seconds,
+                                frame_size=args.frame_size, encode=args.encode,
+                                seed=args.seed))
+    counts = classes.tolist() if classes is not None else []
+    report["classes"] = dict(zip(predict_fn.class_names, counts))
+    print(json.dumps(report, indent=2))
+    return(0)
+
+def main(argv=None) -> int:
+    return(run(build_parser().parse_args(argv)))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+import functools
+import gzip
+import json
+import os
+import resource
+import socket
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+###############################################################################
+# Instrumentation | spans, counters and memory snapshots
+# Stages of the pipeline (load, filter, scale, project, fit, predict,
+# evaluate) are wrapped in spans.  Every span updates running totals; the
+# most recent MAX_EVENTS are also kept as events.  Both can be exported:
+#
+#   prometheus_text()           text exposition format (GET /metrics)
+#   write_chrome_trace(path)    Trace Event JSON for chrome://tracing or
+#                               Perfetto; tensorboard_trace_path() puts it
+#                               where TensorBoard's profile plugin looks
+#
+# Spans only use the standard library, so they cost a few microseconds and
+# never pull in TensorFlow.
+###############################################################################
+MAX_EVENTS = 100_000
+METRIC_PREFIX = "vehicle_classification"
+
+def rss_bytes() -> int:
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        return(int(statm.read_text().split()[1]) * os.sysconf("SC_PAGE_SIZE"))
+    # no /proc: fall back to the peak resident set size
+    return(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+class Tracer:
+    def __init__(self, max_events: int=MAX_EVENTS):
+        self.events = deque(maxlen=max_events)
+        self.span_count = defaultdict(int)
+        self.span_seconds = defaultdict(float)
+        self.span_max_seconds = defaultdict(float)
+        self.counters = defaultdict(float)
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+
+    def _now_us(self) -> float:
+        return((time.perf_counter_ns() - self._origin) / 1000.0)
+
+    @contextmanager
+    def span(self, name: str, memory: bool=False, **args):
+        rss_before = rss_bytes() if memory else None
+        start = self._now_us()
+        try:
+            yield args
+        finally:
+            duration = self._now_us() - start
+            if memory:
+                rss_after = rss_bytes()
+                args["rss_mb"] = round(rss_after / 2**20, 2)
+                args["rss_delta_mb"] = round((rss_after - rss_before) / 2**20, 2)
+                self.gauge("rss_bytes", rss_after)
+            seconds = duration / 1e6
+            with self._lock:
+                self.span_count[name] += 1
+                self.span_seconds[name] += seconds
+                self.span_max_seconds[name] = max(self.span_max_seconds[name], seconds)
+                self.events.append({
+                    "name": name, "ph": "X", "ts": start, "dur": duration,
+                    "pid": self._pid, "tid": threading.get_ident(),
+                    "args": {k: v for k, v in args.items()
+                             if isinstance(v, (int, float, str, bool))}})
+
+    def count(self, name: str, value: float=1):
+        with self._lock:
+            self.counters[name] += value
+            self.events.append({
+                "name": name, "ph": "C", "ts": self._now_us(), "pid": self._pid,
+                "args": {name: self.counters[name]}})
+
+    def gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def memory_snapshot(self, label: str) -> dict:
+        snapshot = {"rss_mb": round(rss_bytes() / 2**20, 2)}
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot.update(traced_mb=round(current / 2**20, 2),
+                            traced_peak_mb=round(peak / 2**20, 2))
+        self.gauge("rss_bytes", rss_bytes())
+        with self._lock:
+            self.events.append({
+                "name": f"memory:{label}", "ph": "C", "ts": self._now_us(),
+                "pid": self._pid, "args": snapshot})
+        return(snapshot)
+
+    def reset(self):
+        with self._lock:
+            self.events.clear()
+            for table in (self.span_count, self.span_seconds,
+                          self.span_max_seconds, self.counters, self.gauges):
+                table.clear()
+
+    ###########################################################################
+    # Export
+    ###########################################################################
+    def summary(self) -> dict:
+        with self._lock:
+            return({name: {"count": self.span_count[name],
+                           "total_s": round(self.span_seconds[name], 6),
+                           "max_s": round(self.span_max_seconds[name], 6)}
+                    for name in sorted(self.span_count)})
+
+    def prometheus_text(self) -> str:
+        p = METRIC_PREFIX
+        with self._lock:
+            lines = [f"# TYPE {p}_span_seconds_total counter",
+                     *(f'{p}_span_seconds_total{{span="{k}"}} {v:.6f}'
+                       for k, v in sorted(self.span_seconds.items())),
+                     f"# TYPE {p}_span_count_total counter",
+                     *(f'{p}_span_count_total{{span="{k}"}} {v}'
+                       for k, v in sorted(self.span_count.items())),
+                     f"# TYPE {p}_span_max_seconds gauge",
+                     *(f'{p}_span_max_seconds{{span="{k}"}} {v:.6f}'
+                       for k, v in sorted(self.span_max_seconds.items())),
+                     f"# TYPE {p}_events_total counter",
+                     *(f'{p}_events_total{{name="{k}"}} {v:g}'
+                       for k, v in sorted(self.counters.items()))]
+            for name, value in sorted(self.gauges.items()):
+                lines += [f"# TYPE {p}_{name} gauge", f"{p}_{name} {value}"]
+        return("\n".join(lines) + "\n")
+
+    def write_chrome_trace(self, path: Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            payload = json.dumps({"traceEvents": list(self.events),
+                                  "displayTimeUnit": "ms"})
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "wt") as f:
+            f.write(payload)
+        return(path)
+
+TRACER = Tracer()
+
+def tensorboard_trace_path(log_dir: Path, run: str=None) -> Path:
+    run = run or time.strftime("%Y_%m_%d_%H_%M_%S")
+    return(Path(log_dir) / "plugins" / "profile" / run /
+           f"{socket.gethostname()}.trace.json.gz")
+
+###############################################################################
+# Helpers for the default tracer
+###############################################################################
+def span(name: str, memory: bool=False, **args):
+    return(TRACER.span(name, memory=memory, **args))
+
+def count(name: str, value: float=1):
+    TRACER.count(name, value)
+
+def memory_snapshot(label: str) -> dict:
+    return(TRACER.memory_snapshot(label))
+
+def traced(name: str, memory: bool=True):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(name, memory=memory, fn=fn.__qualname__):
+                return(fn(*args, **kwargs))
+        return(wrapper)
+    return(decorate)
+
+###############################################################################
+# Keras Callback | one span per epoch, batch counter, memory per epoch
+###############################################################################
+def trace_callback(tracer: Tracer=None, prefix: str="fit"):
+    from keras.callbacks import Callback
+
+    tracer = tracer or TRACER
+
+    class TraceCallback(Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self._span = tracer.span(f"{prefix}.epoch", memory=True, epoch=epoch)
+            self._span.__enter__()
+
+        def on_train_batch_end(self, batch, logs=None):
+            tracer.count(f"{prefix}.batches")
+
+        def on_epoch_end(self, epoch, logs=None):
+            self._span.__exit__(None, None, None)
+
+        def on_predict_batch_end(self, batch, logs=None):
+            tracer.count("predict.batches")
+
+    return(TraceCallback())
+
+###############################################################################
+# Prometheus-style endpoint (GET /metrics)
+###############################################################################
+def serve_metrics(port: int=9464, host: str="127.0.0.1",
+                  tracer: Tracer=None) -> ThreadingHTTPServer:
+    tracer = tracer or TRACER
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = tracer.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return(server)
@@ -0,0 +1,94 @@
+import json
+import weakref
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from .config import INPUT_SHAPE
+from .pipeline import make_dataset
+from .preprocessing import SCALER_LAYER_NAME
+
+###############################################################################
+# Layers to inspect in feature maps (skips the fused scaler)
+###############################################################################
+def feature_layers(model) -> list:
+    return([layer for layer in model.layers if layer.name != SCALER_LAYER_NAME])
+
+###############################################################################
+# Multi-output Activation Model
+# Built once per trained model and cached for as long as that model lives.
+###############################################################################
+_ACTIVATION_MODELS = weakref.WeakKeyDictionary()
+
+def activation_model(model):
+    cached = _ACTIVATION_MODELS.get(model)
+    if cached is None:
+        layers = feature_layers(model)
+        multi = keras.Model(inputs=model.input,
+                            outputs=[layer.output for layer in layers])
+        signature = tf.TensorSpec(shape=(None,) + INPUT_SHAPE, dtype=tf.float32)
+        forward = tf.function(lambda x: multi(x, training=False),
+                              input_signature=[signature])
+        cached = ([layer.name for layer in layers], forward)
+        _ACTIVATION_MODELS[model] = cached
+    return(cached)
+
+###############################################################################
+# Extract Activations | one forward pass per batch, all layers at once
+###############################################################################
+def _iter_activations(model, X: np.ndarray, batch_size: int):
+    _, forward = activation_model(model)
+    for x in make_dataset(X, batch_size=batch_size):
+        yield [out.numpy() for out in forward(x)]
+
+def extract_activations(model, X: np.ndarray, batch_size: int=256,
+                        dtype=np.float32) -> list:
+    batches = list(_iter_activations(model, X, batch_size))
+    return([np.concatenate([b[i] for b in batches]).astype(dtype, copy=False)
+            for i in range(len(batches[0]))])
+
+###############################################################################
+# On-disk Activation Store
+# One float16 .npy per layer, filled batch by batch through open_memmap and
+# loaded lazily (memory-mapped) one layer at a time.
+###############################################################################
+class ActivationStore:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        self.layers = self.meta["layers"]
+        self._loaded = {}
+
+    def __len__(self) -> int:
+        return(len(self.layers))
+
+    def __getitem__(self, layer) -> np.ndarray:
+        name = self.layers[layer] if isinstance(layer, int) else layer
+        if name not in self._loaded:
+            self._loaded[name] = np.load(self.path / f"{name}.npy", mmap_mode="r")
+        return(self._loaded[name])
+
+def write_activations(model, X: np.ndarray, path: Path, batch_size: int=256,
+                      dtype=np.float16) -> ActivationStore:
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    names, _ = activation_model(model)
+    stores, start = None, 0
+    for outputs in _iter_activations(model, X, batch_size):
+        if stores is None:
+            stores = [np.lib.format.open_memmap(
+                          path / f"{name}.npy", mode="w+", dtype=dtype,
+                          shape=(len(X),) + out.shape[1:])
+                      for name, out in zip(names, outputs)]
+        stop = start + len(outputs[0])
+        for store, out in zip(stores, outputs):
+            store[start:stop] = out
+        start = stop
+    for store in stores:
+        store.flush()
+    (path / "meta.json").write_text(json.dumps(
+        {"layers": names, "n_images": len(X), "dtype": np.dtype(dtype).name},
+        indent=2))
+    return(ActivationStore(path))
@@ -0,0 +1,138 @@
+import numpy as np
+
+from .config import CLASS_NAMES, NUM_CLASSES
+
+###############################################################################
+# Confusion Matrix | bincount-based, streaming
+# Rows are true classes, columns predicted classes.  update() folds a batch
+# of labels in with a single bincount, so evaluation over any number of
+# batches keeps only the k x k counts in memory.
+###############################################################################
+def _ratio(num, den):
+    num = np.asarray(num, dtype=np.float64)
+    return(np.divide(num, den, out=np.full_like(num, np.nan), where=den != 0))
+
+class ConfusionMatrix:
+    def __init__(self, num_classes: int=NUM_CLASSES):
+        self.num_classes = num_classes
+        self.matrix = np.zeros((num_classes, num_classes), dtype=np.int64)
+
+    @classmethod
+    def from_predictions(cls, y_true, y_pred, num_classes: int=NUM_CLASSES):
+        return(cls(num_classes).update(y_true, y_pred))
+
+    def update(self, y_true, y_pred):
+        k = self.num_classes
+        y_true = np.asarray(y_true, dtype=np.int64).reshape(-1)
+        y_pred = np.asarray(y_pred, dtype=np.int64).reshape(-1)
+        self.matrix += np.bincount(
+            y_true * k + y_pred, minlength=k * k).reshape(k, k)
+        return(self)
+
+    def merge(self, other):
+        self.matrix += other.matrix
+        return(self)
+
+    @property
+    def total(self) -> int:
+        return(int(self.matrix.sum()))
+
+    def accuracy(self) -> float:
+        return(float(_ratio(np.trace(self.matrix), self.total)))
+
+    def recall(self) -> np.ndarray:
+        return(_ratio(np.diag(self.matrix), self.matrix.sum(axis=1)))
+
+    def precision(self) -> np.ndarray:
+        return(_ratio(np.diag(self.matrix), self.matrix.sum(axis=0)))
+
+    def per_class(self, names: tuple=CLASS_NAMES) -> dict:
+        # recall / precision of every class, keyed by name
+        return({name: {"recall": float(r), "precision": float(p)}
+                for name, r, p in zip(names, self.recall(), self.precision())})
+
+    def binary_metrics(self, positive: int=1) -> tuple:
+        # one-vs-rest counts for the positive class
+        tp = self.matrix[positive, positive]
+        fn = self.matrix[positive].sum() - tp
+        fp = self.matrix[:, positive].sum() - tp
+        tn = self.total - tp - fn - fp
+        return(self.accuracy(),
+               float(_ratio(tp, tp + fn)),
+               float(_ratio(tp, tp + fp)),
+               float(_ratio(fp, fp + tn)),
+               float(_ratio(fp, fp + tp)))
+
+###############################################################################
+# Measure accuracy, recall, precision, fpr, fdr
+###############################################################################
+def get_metrics(y_true, y_preds, num_classes: int=NUM_CLASSES, positive: int=1):
+    return(ConfusionMatrix.from_predictions(
+        y_true, y_preds, num_classes).binary_metrics(positive))
+
+###############################################################################
+# Return Accuracy from Confusion Matrix (overall, class 0, class 1, ...)
+###############################################################################
+def get_acc_from_conf(conf_mtx):
+    conf_mtx = np.asarray(conf_mtx)
+    acc = _ratio(np.trace(conf_mtx), conf_mtx.sum())
+    return(float(acc), *_ratio(np.diag(conf_mtx), conf_mtx.sum(axis=1)))
+
+###############################################################################
+# ROC / AUC from Score Histograms
+# Scores for the positive class are bucketed into fixed bins, split by the
+# true label.  The curve is read off the cumulative counts, so memory stays
+# at 2 x bins counters however many samples are scored.
+###############################################################################
+class RocHistogram:
+    def __init__(self, bins: int=1000):
+        self.bins = bins
+        self.pos = np.zeros(bins, dtype=np.int64)
+        self.neg = np.zeros(bins, dtype=np.int64)
+
+    def update(self, is_positive, scores):
+        is_positive = np.asarray(is_positive, dtype=bool).reshape(-1)
+        idx = np.clip((np.asarray(scores).reshape(-1) * self.bins).astype(np.int64),
+                      0, self.bins - 1)
+        self.pos += np.bincount(idx[is_positive], minlength=self.bins)
+        self.neg += np.bincount(idx[~is_positive], minlength=self.bins)
+        return(self)
+
+    def roc_curve(self):
+        # thresholds run from the highest bin down to the lowest
+        tpr = np.concatenate([[0.0], np.cumsum(self.pos[::-1]) / max(self.pos.sum(), 1)])
+        fpr = np.concatenate([[0.0], np.cumsum(self.neg[::-1]) / max(self.neg.sum(), 1)])
+        thresholds = np.concatenate([[1.0], np.arange(self.bins - 1, -1, -1) / self.bins])
+        return(fpr, tpr, thresholds)
+
+    def auc(self) -> float:
+        fpr, tpr, _ = self.roc_curve()
+        return(float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)))
+
+###############################################################################
+# Streaming Evaluation | confusion matrix plus ROC histogram per model
+###############################################################################
+METRIC_NAMES = ("Accuracy", "Recall", "Precision", "FPR", "FDR", "AUC")
+
+class StreamingEvaluation:
+    def __init__(self, num_classes: int=NUM_CLASSES, positive: int=1,
+                 bins: int=1000):
+        self.positive = positive
+        self.confusion = ConfusionMatrix(num_classes)
+        self.roc = RocHistogram(bins)
+
+    def update(self, y_true, probs):
+        y_true = np.asarray(y_true).reshape(-1)
+        probs = np.asarray(probs)
+        self.confusion.update(y_true, probs.argmax(axis=1))
+        self.roc.update(y_true == self.positive, probs[:, self.positive])
+        return(self)
+
+    def metrics(self) -> tuple:
+        return(self.confusion.binary_metrics(self.positive) + (self.roc.auc(),))
+
+    def summary(self) -> dict:
+        return(dict(zip(METRIC_NAMES, self.metrics())))
+
+    def per_class(self, names: tuple=CLASS_NAMES) -> dict:
+        return(self.confusion.per_class(names))
@@ -0,0 +1,109 @@
+from contextlib import contextmanager
+from pathlib import Path
+
+from keras import Sequential
+from keras.layers import Conv2D, Dense, Dropout, Flatten, MaxPool2D
+from tensorflow import keras
+
+from .config import INPUT_SHAPE, NUM_CLASSES
+from .preprocessing import MinMaxImageScaler
+
+###############################################################################
+# Fast Training Mode
+# Opt-in: XLA JIT compilation, several steps per execution and, where the
+# CPU has native bfloat16 (AVX512-BF16 / AMX), the mixed_bfloat16 policy.
+# Output layers always compute in float32 so the loss stays stable.
+###############################################################################
+FAST_STEPS_PER_EXECUTION = 32
+
+def cpu_supports_bf16() -> bool:
+    cpuinfo = Path("/proc/cpuinfo")
+    if not cpuinfo.exists():
+        return(False)
+    flags = cpuinfo.read_text()
+    return("avx512_bf16" in flags or "amx_bf16" in flags)
+
+def fast_precision_policy() -> str:
+    return("mixed_bfloat16" if cpu_supports_bf16() else "float32")
+
+@contextmanager
+def precision_policy(name: str):
+    previous = keras.mixed_precision.global_policy()
+    keras.mixed_precision.set_global_policy(name)
+    try:
+        yield
+    finally:
+        keras.mixed_precision.set_global_policy(previous)
+
+def compile_kwargs(fast: bool=False, steps_per_execution: int=None) -> dict:
+    if not fast:
+        return({})
+    return({"jit_compile": True,
+            "steps_per_execution": steps_per_execution or FAST_STEPS_PER_EXECUTION})
+
+###############################################################################
+# Output head
+# Two classes keep the original sigmoid / binary cross-entropy head; more
+# classes use softmax / categorical cross-entropy.  Either way there is one
+# unit per class and the labels are one-hot.
+###############################################################################
+def output_head(num_classes: int=NUM_CLASSES) -> tuple:
+    if num_classes == 2:
+        return(Dense(units=2, activation="sigmoid", dtype="float32"),
+               "binary_crossentropy")
+    return(Dense(units=num_classes, activation="softmax", dtype="float32"),
+           "categorical_crossentropy")
+
+###############################################################################
+# Model input layers (optionally with the fused scaler)
+###############################################################################
+def input_layers(scaler: MinMaxImageScaler=None) -> list:
+    layers = [keras.Input(shape=INPUT_SHAPE)]
+    if scaler is not None:
+        layers.append(scaler.as_layer())
+    return(layers)
+
+###############################################################################
+# CNN Base Model
+###############################################################################
+def build_base_model(scaler: MinMaxImageScaler=None, fast: bool=False,
+                     steps_per_execution: int=None, num_classes: int=NUM_CLASSES):
+    head, loss = output_head(num_classes)
+    with precision_policy(fast_precision_policy() if fast else "float32"):
+        model = Sequential(input_layers(scaler))
+        model.add(Conv2D(32, (3,3), activation="relu"))
+        model.add(MaxPool2D(pool_size=(2,2)))
+        model.add(Flatten())
+        model.add(head)
+
+    model.compile(
+        optimizer="adam", 
+        loss=loss, 
+        metrics=["accuracy"],
+        **compile_kwargs(fast, steps_per_execution))
+    return(model)
+
+###############################################################################
+# CNN Optimized Model
+###############################################################################
+def build_model(scaler: MinMaxImageScaler=None, fast: bool=False,
+                steps_per_execution: int=None, num_classes: int=NUM_CLASSES):
+    head, loss = output_head(num_classes)
+    with precision_policy(fast_precision_policy() if fast else "float32"):
+        model = Sequential(input_layers(scaler))
+        model.add(Conv2D(32, (3,3), activation="relu"))
+        model.add(MaxPool2D(pool_size=(2,2)))
+        model.add(Dropout(rate=0.35000000000000003))
+        model.add(Conv2D(16, (3,3) ))
+        model.add(MaxPool2D(pool_size=(2,2)))
+        model.add(Dropout(rate=0.35000000000000003))
+        model.add(Flatten())
+        model.add(Dense(units=128, activation="relu"))
+        model.add(head)
+
+    model.compile(
+        optimizer="adam", 
+        loss=loss, 
+        metrics=["accuracy"],
+        **compile_kwargs(fast, steps_per_execution))
+    return(model)
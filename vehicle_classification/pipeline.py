@@ -0,0 +1,119 @@
+import numpy as np
+import tensorflow as tf
+
+from .config import BATCH_SIZE, INPUT_SHAPE, NUM_CLASSES, SEED, STREAM_CHUNK
+
+###############################################################################
+# Streaming tf.data Input Pipeline
+# Images stay uint8 on the host.  Casting, scaling, reshaping and one-hot
+# encoding run per batch inside the graph (parallel map + prefetch), so no
+# full float32 copy of the dataset is ever materialised.
+###############################################################################
+AUTOTUNE = tf.data.AUTOTUNE
+IN_MEMORY_BYTES = 1 << 30  # arrays above this are streamed from disk in chunks
+
+def _array_source(arrays, indices: np.ndarray=None, chunk_size: int=STREAM_CHUNK):
+    if sum(a.nbytes for a in arrays) <= IN_MEMORY_BYTES:
+        if indices is None:
+            return(tf.data.Dataset.from_tensor_slices(arrays))
+        # rows are gathered from the full arrays, so the split is never copied
+        tensors = tuple(tf.constant(np.asarray(a)) for a in arrays)
+        return(tf.data.Dataset.from_tensor_slices(indices).map(
+            lambda i: tuple(tf.gather(t, i) for t in tensors),
+            num_parallel_calls=AUTOTUNE, deterministic=True))
+
+    # Too large for a graph constant: read chunks from the (memory-mapped)
+    # arrays and unbatch them into elements.
+    n_rows = len(arrays[0]) if indices is None else len(indices)
+    def chunks():
+        for start in range(0, n_rows, chunk_size):
+            rows = slice(start, start + chunk_size) if indices is None \
+                else indices[start:start + chunk_size]
+            yield tuple(np.asarray(a[rows]) for a in arrays)
+
+    signature = tuple(
+        tf.TensorSpec(shape=(None,) + a.shape[1:], dtype=tf.as_dtype(a.dtype))
+        for a in arrays)
+    return(tf.data.Dataset.from_generator(
+        chunks, output_signature=signature).unbatch())
+
+def shard_arrays(arrays, num_shards: int, index: int) -> tuple:
+    # Contiguous, equal-length blocks: views of (memory-mapped) arrays, and
+    # every worker runs the same number of steps so collectives never stall.
+    shard_len = len(arrays[0]) // num_shards
+    start = index * shard_len
+    return(tuple(a[start:start + shard_len] for a in arrays))
+
+def tf_preprocess_x(x, scale_range=None):
+    x = tf.cast(x, tf.float32)
+    if scale_range is not None:
+        lo, hi = scale_range
+        x = (x - lo) / (hi - lo)
+    return(tf.reshape(x, (-1,) + INPUT_SHAPE))
+
+def tf_preprocess_y(y, num_classes: int=NUM_CLASSES):
+    return(tf.one_hot(tf.reshape(tf.cast(y, tf.int32), [-1]), num_classes))
+
+###############################################################################
+# Augmentation Seeds
+# augmentation.Augmentation's stateless ops are seeded from (epoch seed,
+# batch index).  enumerate() restarts at 0 every epoch, so the epoch seed is
+# drawn from a seeded generator once each time the dataset is iterated:
+# a seeded run is reproducible and every epoch sees new draws, whether or
+# not the data is shuffled.
+###############################################################################
+def _augmented(ds: tf.data.Dataset, augment, seed: int) -> tf.data.Dataset:
+    generator = tf.random.Generator.from_seed(seed)
+    def epoch(epoch_seed):
+        return(ds.enumerate().map(
+            lambda step, batch: augment(*batch, seed=
+                tf.random.experimental.stateless_fold_in(epoch_seed, step)),
+            num_parallel_calls=AUTOTUNE, deterministic=True))
+    return(tf.data.Dataset.from_tensors(0)
+           .map(lambda _: generator.make_seeds(1)[:, 0])
+           .flat_map(epoch))
+
+def make_dataset(X: np.ndarray, y: np.ndarray=None,
+                 batch_size: int=BATCH_SIZE,
+                 shuffle: bool=False,
+                 seed: int=SEED,
+                 shuffle_buffer: int=None,
+                 cache=None,
+                 scale_range=None,
+                 num_classes: int=NUM_CLASSES,
+                 shard: tuple=None,
+                 indices: np.ndarray=None,
+                 augment=None) -> tf.data.Dataset:
+    if augment is not None and y is None:
+        raise ValueError("augmentation needs labels (CutMix / MixUp mix them)")
+    arrays = (X,) if y is None else (X, y)
+    if shard is not None:
+        # (num_workers, worker_index): each worker reads only its own rows
+        if indices is None:
+            arrays = shard_arrays(arrays, *shard)
+        else:
+            indices = shard_arrays((indices,), *shard)[0]
+    ds = _array_source(arrays, indices)
+    if cache is not None:
+        # "" caches the uint8 elements in memory, a path caches them on disk
+        ds = ds.cache(str(cache))
+    if shuffle:
+        n_rows = len(arrays[0]) if indices is None else len(indices)
+        buffer = shuffle_buffer or min(n_rows, 100_000)
+        ds = ds.shuffle(buffer, seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+
+    if y is None:
+        prep = lambda x: tf_preprocess_x(x, scale_range)
+    else:
+        prep = lambda x, y: (tf_preprocess_x(x, scale_range),
+                             tf_preprocess_y(y, num_classes))
+    ds = ds.map(prep, num_parallel_calls=AUTOTUNE, deterministic=True)
+    if augment is not None:
+        ds = _augmented(ds, augment, seed)
+    if shard is not None:
+        options = tf.data.Options()
+        options.experimental_distribute.auto_shard_policy = \
+            tf.data.experimental.AutoShardPolicy.OFF
+        ds = ds.with_options(options)
+    return(ds.prefetch(AUTOTUNE))
@@ -0,0 +1,76 @@
+import matplotlib.pyplot as plt
+import numpy as np
+
+###############################################################################
+# Plot Image
+###############################################################################
+def plot_image(X: np.ndarray, idx: int=0):
+    plt.imshow(X[idx].reshape(32, 32, 3));
+
+###############################################################################
+# Plot Feature Map
+###############################################################################
+def plot_feature_map(activations, layer=0, n_col=8, n_row=4, idx=0):
+    plt.figure(figsize=(n_col, n_row))
+    for j in range(n_row * n_col):
+        plt.subplot(n_row, n_col, j + 1)
+        plt.imshow(np.asarray(activations[layer][idx, :, :, j], dtype=np.float32))
+        plt.xticks(())
+        plt.yticks(())
+    plt.show;
+
+###############################################################################
+# Plot Image Map
+###############################################################################
+def plot_image_matrix(mod, n_col=10, n_row=10):
+    plt.figure(figsize=(n_col, n_row)) 
+    for j in range(n_col*n_row):
+        plt.subplot(n_col, n_row, j + 1) 
+        plt.imshow(mod[j].reshape(32, 32, 3)) 
+        plt.xticks(())
+        plt.yticks(())
+
+###############################################################################
+# Plot Model Results (loss) from History
+###############################################################################
+def plot_model_results(history):
+    plt.plot(history.history['loss'])
+    plt.plot(history.history['val_loss'])
+    plt.title('model loss')
+    plt.ylabel('loss')
+    plt.xlabel('epoch')
+    plt.legend(['train', 'val'], loc='upper right')
+    plt.show();
+
+###############################################################################
+# Plot Model Accuracy from History
+###############################################################################
+def plot_model_accuracy(history):
+    plt.plot(history.history['accuracy'], label='train')
+    plt.plot(history.history['val_accuracy'], label='val')
+    plt.title('model accuracy')
+    plt.ylabel('accuracy')
+    plt.xlabel('epoch')
+    plt.legend(['train', 'val'], loc='upper right')
+    plt.ylim([0.5, 1])
+    plt.legend(loc='lower right')
+    plt.show();
+
+###############################################################################
+# Plot PCA Scree Plot
+###############################################################################
+def plt_pca_scree_plot(pca_mod):
+    fig, ax = plt.subplots(1,2)
+    fig.suptitle("Scree Plot")
+    fig.set_size_inches(10, 5)
+    fig.set_dpi(80)
+    fig.tight_layout(pad=5.0)
+    ax[0].plot(pca_mod.explained_variance_ratio_)
+    ax[0].set_xlabel('number of components')
+    ax[0].set_ylabel('ratio explained variance')
+    ax[0].set_title("Ratio")
+    ax[1].plot(np.cumsum(pca_mod.explained_variance_ratio_))
+    ax[1].set_xlabel('number of components')
+    ax[1].set_ylabel('cumulative explained variance')
+    ax[1].set_title("Cumulative Sum ")
+    fig.show();
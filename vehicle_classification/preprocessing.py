@@ -0,0 +1,87 @@
+import numpy as np
+from dataclasses import dataclass, field
+
+from .config import INPUT_SHAPE, STREAM_CHUNK
+from .instrumentation import traced
+
+###############################################################################
+# Min-Max Scaler
+# Statistics are gathered once at fit time in a single chunked pass.  The
+# transform runs in place, or is fused into the model as its input layer so
+# the statistics are saved with the model and inference never rescans data.
+###############################################################################
+SCALER_LAYER_NAME = "minmax_scaler"
+
+@dataclass
+class MinMaxImageScaler:
+    per_channel: bool = True
+    data_min_: np.ndarray = field(default=None, repr=False)
+    data_max_: np.ndarray = field(default=None, repr=False)
+
+    def _n_stats(self) -> int:
+        return(INPUT_SHAPE[-1] if self.per_channel else 1)
+
+    @traced("scale")
+    def fit(self, X: np.ndarray, chunk_size: int=STREAM_CHUNK,
+            indices: np.ndarray=None):
+        lo = hi = None
+        n_rows = len(X) if indices is None else len(indices)
+        for start in range(0, n_rows, chunk_size):
+            # channels are the fastest-varying axis, for images or flattened
+            rows = slice(start, start + chunk_size) if indices is None \
+                else indices[start:start + chunk_size]
+            chunk = np.asarray(X[rows])
+            chunk = chunk.reshape(-1, self._n_stats())
+            c_lo, c_hi = chunk.min(axis=0), chunk.max(axis=0)
+            lo = c_lo if lo is None else np.minimum(lo, c_lo)
+            hi = c_hi if hi is None else np.maximum(hi, c_hi)
+        self.data_min_ = lo.astype(np.float32)
+        self.data_max_ = hi.astype(np.float32)
+        return(self)
+
+    @property
+    def data_range_(self) -> np.ndarray:
+        rng = self.data_max_ - self.data_min_
+        return(np.where(rng == 0, 1, rng).astype(np.float32))
+
+    @traced("scale")
+    def transform(self, X: np.ndarray, inplace: bool=False) -> np.ndarray:
+        if inplace:
+            if not (np.issubdtype(X.dtype, np.floating) and X.flags.c_contiguous
+                    and X.flags.writeable):
+                raise ValueError(
+                    "in-place scaling needs a writeable, C-contiguous float array")
+            out = X
+        else:
+            out = np.array(X, dtype=np.float32)
+        view = out.reshape(-1, self._n_stats())
+        np.subtract(view, self.data_min_, out=view)
+        np.divide(view, self.data_range_, out=view)
+        return(out)
+
+    def fit_transform(self, X: np.ndarray) -> np.ndarray:
+        return(self.fit(X).transform(X))
+
+    def as_layer(self):
+        from tensorflow import keras
+
+        # (x - mean) / sqrt(variance) == (x - min) / (max - min)
+        channels = INPUT_SHAPE[-1]
+        return(keras.layers.Normalization(
+            axis=-1,
+            mean=np.broadcast_to(self.data_min_, (channels,)),
+            variance=np.broadcast_to(self.data_range_, (channels,)) ** 2,
+            name=SCALER_LAYER_NAME))
+
+###############################################################################
+# Flattens tensor image for PCA and NMF processing
+###############################################################################
+def my_flattener(x):
+    cnt, h, w, d = x.shape
+    return x.reshape(cnt, h*w*d)
+
+###############################################################################
+# Min-Max Scaling
+###############################################################################
+def my_minmax(x):
+    return(MinMaxImageScaler(per_channel=False).fit_transform(x))
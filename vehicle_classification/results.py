@@ -0,0 +1,153 @@
+import json
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from .config import NUM_CLASSES
+from .instrumentation import span
+from .metrics import METRIC_NAMES, ConfusionMatrix, RocHistogram
+
+###############################################################################
+# Dataclass for Processing Results
+# Labels are stored as uint8 and probabilities as float16.  Metrics come
+# from one confusion matrix / ROC histogram, computed on first use and
+# memoised, so printing a result never rescans its arrays.
+###############################################################################
+METRIC_KEYS = tuple(name.lower() for name in METRIC_NAMES)
+
+@dataclass
+class ClassifierResults:
+  name: str
+  y_true: np.ndarray = field(repr=False)
+  preds: np.ndarray = field(repr=False)
+  probs: np.ndarray = field(repr=False, default=None)
+  positive: int = field(repr=False, default=1)
+  _metrics: dict = field(init=False, repr=False, compare=False, default=None)
+
+  def __post_init__(self):
+    self.y_true = np.asarray(self.y_true).reshape(-1).astype(np.uint8)
+    self.preds = np.asarray(self.preds).reshape(-1).astype(np.uint8)
+    if self.probs is not None:
+      self.probs = np.asarray(self.probs).astype(np.float16)
+
+  def __repr__(self) -> None:
+    rtn = f"Results for {self.name}\n" +           f"Accuracy:\t {self.accuracy()}\n"
+    return(rtn)
+
+  @property
+  def num_classes(self) -> int:
+    return(self.probs.shape[1] if self.probs is not None else NUM_CLASSES)
+
+  def confusion(self) -> ConfusionMatrix:
+    return(ConfusionMatrix.from_predictions(
+        self.y_true, self.preds, self.num_classes))
+
+  def metrics(self) -> dict:
+    if self._metrics is None:
+      with span("evaluate", results=self.name):
+        values = list(self.confusion().binary_metrics(self.positive))
+        auc = float("nan")
+        if self.probs is not None:
+          auc = RocHistogram().update(
+              self.y_true == self.positive,
+              self.probs[:, self.positive].astype(np.float32)).auc()
+        self._metrics = dict(zip(METRIC_KEYS, values + [auc]))
+    return(self._metrics)
+
+  def accuracy(self) -> float:
+    return (self.metrics()["accuracy"])
+
+  def save(self, path: Path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    arrays = {"y_true": self.y_true, "preds": self.preds}
+    if self.probs is not None:
+      arrays["probs"] = self.probs
+    with open(path, "wb") as f:
+      np.savez_compressed(f, name=np.array(self.name), **arrays)
+    return(path)
+
+  @classmethod
+  def load(cls, path: Path, positive: int=1):
+    with np.load(path) as data:
+      return(cls(name=str(data["name"]),
+                 y_true=data["y_true"],
+                 preds=data["preds"],
+                 probs=data["probs"] if "probs" in data.files else None,
+                 positive=positive))
+
+###############################################################################
+# Make Predictions
+###############################################################################
+def make_predictions(label, model, X_fitted, y_true):
+  # one predict_proba pass; labels are the most probable class
+  probs = model.predict_proba(X_fitted)
+  results = ClassifierResults(
+      name = label,
+      y_true = y_true,
+      preds = model.classes_[probs.argmax(axis=1)],
+      probs = probs
+  )
+  return (results)
+
+###############################################################################
+# Results Store
+# Each run is one compressed .npz under runs/.  index.jsonl holds one line
+# per run with its name, tags and metrics, so listing, filtering and
+# comparing months of runs reads only the index; prediction arrays are
+# loaded one run at a time, on request.
+###############################################################################
+RESULTS_DIR = Path("results")
+
+class ResultsStore:
+  def __init__(self, root: Path=RESULTS_DIR):
+    self.root = Path(root)
+    self.index = self.root / "index.jsonl"
+    (self.root / "runs").mkdir(parents=True, exist_ok=True)
+
+  def add(self, results: ClassifierResults, **tags) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", results.name.lower()).strip("-")
+    run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{slug}-{uuid.uuid4().hex[:6]}"
+    path = results.save(self.root / "runs" / f"{run_id}.npz")
+    row = {"run_id": run_id,
+           "name": results.name,
+           "created": time.time(),
+           "n": int(len(results.y_true)),
+           "file": str(path.relative_to(self.root)),
+           "tags": tags,
+           "metrics": results.metrics()}
+    with open(self.index, "a") as f:
+      f.write(json.dumps(row) + "\n")
+    return(run_id)
+
+  def runs(self, name: str=None, since: float=None, **tags):
+    if not self.index.exists():
+      return
+    with open(self.index) as f:
+      for line in f:
+        if not line.strip():
+          continue
+        row = json.loads(line)
+        if name is not None and row["name"] != name:
+          continue
+        if since is not None and row["created"] < since:
+          continue
+        if any(row["tags"].get(k) != v for k, v in tags.items()):
+          continue
+        yield row
+
+  def latest(self, name: str, **tags) -> dict:
+    rows = list(self.runs(name=name, **tags))
+    return(rows[-1] if rows else None)
+
+  def load(self, run_id: str) -> ClassifierResults:
+    return(ClassifierResults.load(self.root / "runs" / f"{run_id}.npz"))
+
+  def compare(self, rows=None, metrics: tuple=METRIC_KEYS) -> list:
+    rows = self.runs() if rows is None else rows
+    return([[row["run_id"], row["name"],
+             *(round(row["metrics"][m], 4) for m in metrics)] for row in rows])
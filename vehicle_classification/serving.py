@@ -0,0 +1,416 @@
+###############################################################################
+# Car / Truck CNN | Batched Inference Server
+#
+# Loads a model saved from the notebook (build_model() with the fused
+# min-max scaler, so raw 0-255 pixels go straight in) once at startup and
+# serves it over HTTP.  Requests are coalesced by a micro-batcher: it waits
+# up to --max-wait-ms or until --max-batch images are queued, then runs a
+# single forward pass.
+#
+#   python -m vehicle_classification serve --model models/car_truck_cnn
+#   python -m vehicle_classification serve --model models/car_truck_cnn_int8.tflite
+#   python -m vehicle_classification serve --model models/lda_pca.joblib
+#   python -m vehicle_classification load-test --images X_test.npy --requests 2000
+#
+# The CIFAR-10 labels a model was trained on are saved beside it
+# (save_class_names), so /predict names the classes of the model actually
+# served, whatever VEHICLE_CLASSES is set to.
+#
+# Only numpy is imported up front.  TensorFlow is loaded when a Keras model
+# is served; .tflite models use tflite_runtime when it is installed, so a
+# TFLite worker never imports TensorFlow at all.  A fused LDA-PCA / LDA-NMF
+# classifier saved with joblib (classical.FusedLDA) is a numpy-only CPU
+# fallback.
+#
+# Endpoints
+#   POST /predict   body: raw uint8 bytes of one or more 32x32x3 images
+#                   (application/octet-stream) or {"images": [...]} JSON
+#   GET  /stats     p50 / p99 latency (ms) and throughput (images/sec)
+#   GET  /metrics   Prometheus text: predict spans, images, RSS
+#   GET  /healthz
+###############################################################################
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+from .config import CLASS_NAMES, INPUT_SHAPE, LABEL_NAMES, SEED, VEHICLE_CLASSES
+from .instrumentation import TRACER
+
+IMAGE_BYTES = int(np.prod(INPUT_SHAPE))
+
+###############################################################################
+# Latency / Throughput Tracking
+###############################################################################
+class LatencyTracker:
+    def __init__(self, window: int=10_000):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._images = 0
+        self._batches = 0
+
+    def record(self, latency_s: float, n_images: int=1):
+        with self._lock:
+            self._latencies.append(latency_s)
+            self._images += n_images
+
+    def record_batch(self):
+        with self._lock:
+            self._batches += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            lat = np.array(self._latencies) * 1000.0
+            elapsed = time.perf_counter() - self._started
+            images, batches = self._images, self._batches
+        p50, p99 = np.percentile(lat, [50, 99]) if len(lat) else (0.0, 0.0)
+        return({
+            "requests": int(len(lat)),
+            "images": images,
+            "batches": batches,
+            "mean_batch_size": round(images / batches, 2) if batches else 0.0,
+            "p50_ms": round(float(p50), 3),
+            "p99_ms": round(float(p99), 3),
+            "throughput_ips": round(images / elapsed, 2) if elapsed else 0.0})
+
+###############################################################################
+# Dynamic Micro-Batching
+###############################################################################
+@dataclass
+class _Pending:
+    images: np.ndarray
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.perf_counter)
+
+class MicroBatcher:
+    def __init__(self, predict_fn, max_batch: int=32, max_wait_ms: float=5.0,
+                 tracker: LatencyTracker=None):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.tracker = tracker or LatencyTracker()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, images: np.ndarray) -> Future:
+        pending = _Pending(images.reshape((-1,) + INPUT_SHAPE))
+        self._queue.put(pending)
+        return(pending.future)
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        return(self.submit(images).result())
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self, first: _Pending) -> list:
+        batch, n_images = [first], len(first.images)
+        deadline = time.perf_counter() + self.max_wait
+        while n_images < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                # put the sentinel back so the run loop stops after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+            n_images += len(item.images)
+        return(batch)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            images = np.concatenate([item.images for item in batch])
+            try:
+                with TRACER.span("predict", batch=len(images)):
+                    probs = self.predict_fn(images)
+                TRACER.count("predict.images", len(images))
+            except Exception as exc:
+                for item in batch:
+                    item.future.set_exception(exc)
+                continue
+
+            self.tracker.record_batch()
+            done, start = time.perf_counter(), 0
+            for item in batch:
+                stop = start + len(item.images)
+                item.future.set_result(probs[start:stop])
+                self.tracker.record(done - item.enqueued, len(item.images))
+                start = stop
+
+###############################################################################
+# Class Names
+# classes.json inside a SavedModel directory, <name>.classes.json next to a
+# .tflite or .joblib file.  Models saved without one fall back to
+# CLASS_NAMES when their output width matches.
+###############################################################################
+def class_names_path(model_path) -> Path:
+    model_path = Path(model_path)
+    if model_path.is_dir():
+        return(model_path / "classes.json")
+    return(model_path.with_suffix(".classes.json"))
+
+def save_class_names(model_path, classes=VEHICLE_CLASSES) -> Path:
+    path = class_names_path(model_path)
+    path.write_text(json.dumps({"classes": [int(c) for c in classes],
+                                "names": [LABEL_NAMES[c] for c in classes]}))
+    return(path)
+
+def load_class_names(model_path, num_outputs: int) -> tuple:
+    path = class_names_path(model_path)
+    if path.exists():
+        names = tuple(json.loads(path.read_text())["names"])
+    elif num_outputs == len(CLASS_NAMES):
+        names = CLASS_NAMES
+    else:
+        names = tuple(f"class_{i}" for i in range(num_outputs))
+    if len(names) != num_outputs:
+        raise ValueError(f"{path} lists {len(names)} classes but the model "
+                         f"has {num_outputs} outputs")
+    return(names)
+
+###############################################################################
+# Model Loading
+# The returned predict_fn carries the model's class_names.
+###############################################################################
+def tflite_interpreter(model_path: str):
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return(Interpreter(model_path=str(model_path)))
+
+def _load_tflite_fn(model_path: str):
+    interpreter = tflite_interpreter(model_path)
+    inp = interpreter.get_input_details()[0]
+    out = interpreter.get_output_details()[0]
+    in_scale, in_zero = inp["quantization"]
+    out_scale, out_zero = out["quantization"]
+    shape = None
+
+    def predict_fn(images: np.ndarray) -> np.ndarray:
+        nonlocal shape
+        if images.shape != shape:
+            shape = images.shape
+            interpreter.resize_tensor_input(inp["index"], shape)
+            interpreter.allocate_tensors()
+        x = images.astype(np.float32)
+        if in_scale:
+            x = np.round(x / in_scale + in_zero)
+        interpreter.set_tensor(inp["index"], x.astype(inp["dtype"]))
+        interpreter.invoke()
+        y = interpreter.get_tensor(out["index"]).astype(np.float32)
+        return((y - out_zero) * out_scale if out_scale else y)
+
+    return(predict_fn)
+
+def load_predict_fn(model_path: str, max_batch: int=32):
+    model_path = str(model_path)
+    if model_path.endswith(".joblib"):
+        # fused LDA-PCA / LDA-NMF (classical.FusedLDA): numpy only
+        import joblib
+
+        model = joblib.load(model_path)
+
+        def predict_fn(images: np.ndarray) -> np.ndarray:
+            return(model.predict_proba(images))
+
+        predict_fn.class_names = load_class_names(model_path, len(model.classes_))
+        return(predict_fn)
+    if model_path.endswith(".tflite"):
+        predict_fn = _load_tflite_fn(model_path)
+        probs = predict_fn(np.zeros((max_batch,) + INPUT_SHAPE, dtype=np.uint8))
+        predict_fn.class_names = load_class_names(model_path, probs.shape[1])
+        return(predict_fn)
+
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    signature = tf.TensorSpec(shape=(None,) + INPUT_SHAPE, dtype=tf.float32)
+    forward = tf.function(
+        lambda x: model(x, training=False), input_signature=[signature])
+
+    def predict_fn(images: np.ndarray) -> np.ndarray:
+        return(forward(images.astype(np.float32)).numpy())
+
+    # trace and warm up before the first request arrives
+    probs = predict_fn(np.zeros((max_batch,) + INPUT_SHAPE, dtype=np.uint8))
+    predict_fn.class_names = load_class_names(model_path, probs.shape[1])
+    return(predict_fn)
+
+###############################################################################
+# HTTP Endpoint
+###############################################################################
+def _decode_images(handler: BaseHTTPRequestHandler) -> np.ndarray:
+    length = int(handler.headers.get("Content-Length", 0))
+    body = handler.rfile.read(length)
+    if handler.headers.get("Content-Type", "").startswith("application/json"):
+        # check before casting: astype(uint8) wraps 300 to 44 and truncates 0.5
+        pixels = np.asarray(json.loads(body)["images"], dtype=np.float64)
+        whole = pixels == np.floor(pixels)
+        if not np.all(whole & (pixels >= 0) & (pixels <= 255)):
+            raise ValueError("pixel values must be whole numbers in 0..255")
+        images = pixels.astype(np.uint8)
+    else:
+        if length == 0 or length % IMAGE_BYTES:
+            raise ValueError(
+                f"body must hold a whole number of {IMAGE_BYTES}-byte images")
+        images = np.frombuffer(body, dtype=np.uint8)
+    return(images.reshape((-1,) + INPUT_SHAPE))
+
+def make_handler(batcher: MicroBatcher, class_names: tuple=CLASS_NAMES):
+    class PredictHandler(BaseHTTPRequestHandler):
+        def _send_json(self, payload: dict, status: int=200):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send_json(batcher.tracker.summary())
+            elif self.path == "/healthz":
+                self._send_json({"status": "ok"})
+            elif self.path == "/metrics":
+                body = TRACER.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json({"error": "not found"}, status=404)
+                return
+            try:
+                images = _decode_images(self)
+            except (ValueError, KeyError, TypeError) as exc:
+                self._send_json({"error": str(exc)}, status=400)
+                return
+            try:
+                probs = batcher.predict(images)
+            except Exception as exc:
+                # predict_fn failures arrive through the batcher's Future
+                self._send_json({"error": f"{type(exc).__name__}: {exc}"},
+                                status=500)
+                return
+            self._send_json({
+                "classes": [class_names[i] for i in probs.argmax(axis=1)],
+                "probs": np.round(probs, 6).tolist()})
+
+        def log_message(self, format, *args):
+            pass
+
+    return(PredictHandler)
+
+def serve(model_path: str, host: str="127.0.0.1", port: int=8500,
+          max_batch: int=32, max_wait_ms: float=5.0):
+    predict_fn = load_predict_fn(model_path, max_batch)
+    batcher = MicroBatcher(predict_fn, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    server = ThreadingHTTPServer((host, port),
+                                 make_handler(batcher, predict_fn.class_names))
+    print(f"Serving {model_path} on http://{host}:{port} "
+          f"(max_batch={max_batch}, max_wait_ms={max_wait_ms})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        print(json.dumps(batcher.tracker.summary(), indent=2))
+
+###############################################################################
+# Local Load Generator
+###############################################################################
+def load_test(url: str, images: np.ndarray, n_requests: int=1000,
+              concurrency: int=16) -> dict:
+    tracker = LatencyTracker(window=n_requests)
+    predict_url = url.rstrip("/") + "/predict"
+
+    def one_request(i: int):
+        body = np.ascontiguousarray(images[i % len(images)]).tobytes()
+        req = urllib.request.Request(
+            predict_url, data=body,
+            headers={"Content-Type": "application/octet-stream"})
+        start = time.perf_counter()
+        with urllib.request.urlopen(req) as resp:
+            resp.read()
+        tracker.record(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(n_requests)))
+
+    client = tracker.summary()
+    with urllib.request.urlopen(url.rstrip("/") + "/stats") as resp:
+        server = json.loads(resp.read())
+    return({"client": client, "server": server})
+
+###############################################################################
+# Command Line
+###############################################################################
+def add_subcommands(sub):
+    p_serve = sub.add_parser("serve", help="serve a saved car/truck model")
+    p_serve.add_argument("--model", required=True)
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8500)
+    p_serve.add_argument("--max-batch", type=int, default=32)
+    p_serve.add_argument("--max-wait-ms", type=float, default=5.0)
+
+    p_load = sub.add_parser("load-test", help="replay images against a server")
+    p_load.add_argument("--url", default="http://127.0.0.1:8500")
+    p_load.add_argument("--images", default=None,
+                        help=".npy of uint8 images (random frames if omitted)")
+    p_load.add_argument("--requests", type=int, default=1000)
+    p_load.add_argument("--concurrency", type=int, default=16)
+
+def run(args) -> int:
+    if args.command == "serve":
+        serve(args.model, args.host, args.port, args.max_batch, args.max_wait_ms)
+    else:
+        if args.images:
+            images = np.load(args.images, mmap_mode="r")
+        else:
+            rng = np.random.default_rng(SEED)
+            images = rng.integers(0, 256, size=(256,) + INPUT_SHAPE,
+                                  dtype=np.uint8)
+        print(json.dumps(
+            load_test(args.url, images, args.requests, args.concurrency),
+            indent=2))
+    return(0)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Batched inference server for the car/truck CNN")
+    add_subcommands(parser.add_subparsers(dest="command", required=True))
+    return(run(parser.parse_args(argv)))
+
+if __name__ == "__main__":
+    sys.exit(main())
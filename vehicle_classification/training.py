@@ -0,0 +1,226 @@
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+from keras.callbacks import Callback, TensorBoard
+
+from .augmentation import Augmentation
+from .config import SEED, VEHICLE_CLASSES
+from .instrumentation import TRACER, trace_callback
+from .data import cifar10_subset_cached, split_indices
+from .models import build_base_model, build_model
+from .pipeline import make_dataset
+from .preprocessing import MinMaxImageScaler
+from .serving import save_class_names
+
+###############################################################################
+# CNN Training Entry Point
+# The notebook's base / optimized fits, runnable from the command line:
+#
+#   python -m vehicle_classification train --model optimized --output models/car_truck_cnn
+###############################################################################
+MODEL_DIR = Path("models")
+CHECKPOINT_DIR = Path("checkpoints")
+BUILDERS = {"base": build_base_model, "optimized": build_model}
+
+###############################################################################
+# Resumable Training
+# Model weights, optimizer slots and the epoch counter are checkpointed
+# every save_every epochs (asynchronously where TensorFlow supports it), so
+# an interrupted run restarts from the last checkpoint instead of epoch 0.
+# The best weights by the monitored validation metric are kept separately
+# with their score and epoch in best.json and restored when training ends.
+# Early stopping is counted from that epoch rather than by a fresh
+# EarlyStopping callback, so patience used up before an interruption stays
+# used up after it.  A run that stopped early is recorded as finished and is
+# not trained again.
+#
+# progress.json records the run config (the model's output shape and
+# parameter count plus whatever the caller passes, e.g. classes, seed,
+# augment); resuming a directory written by a different config raises
+# instead of loading mismatched weights.  history.json keeps the per-epoch
+# logs, so the History returned after a resume covers every epoch.
+###############################################################################
+def _checkpoint_options() -> tf.train.CheckpointOptions:
+    try:
+        return(tf.train.CheckpointOptions(experimental_enable_async_checkpoint=True))
+    except TypeError:
+        # TensorFlow < 2.11 has no async checkpointing
+        return(tf.train.CheckpointOptions())
+
+def run_config(kind: str="optimized", classes=VEHICLE_CLASSES, seed: int=SEED,
+               augment: bool=False, fast: bool=False) -> dict:
+    return({"kind": kind, "classes": [int(c) for c in classes], "seed": seed,
+            "augment": bool(augment), "fast": bool(fast)})
+
+class TrainingCheckpoint(Callback):
+    def __init__(self, directory: Path, monitor: str="val_loss", mode: str="min",
+                 save_every: int=1, max_to_keep: int=2, config: dict=None,
+                 patience: int=None):
+        super().__init__()
+        self.directory = Path(directory)
+        self.monitor = monitor
+        self.mode = mode
+        self.save_every = save_every
+        self.max_to_keep = max_to_keep
+        self.patience = patience
+        self.best_weights = self.directory / "best" / "weights"
+        self._best_file = self.directory / "best.json"
+        self._progress_file = self.directory / "progress.json"
+        self._history_file = self.directory / "history.json"
+        self.config = dict(config or {})
+        self.epoch_logs = []
+        self._epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self._options = _checkpoint_options()
+        self._checkpoint = None
+        self._manager = None
+        self.best = math.inf if mode == "min" else -math.inf
+        self.best_epoch = 0
+        self.stopped_early = False
+
+    def _improved(self, value: float) -> bool:
+        return(value < self.best if self.mode == "min" else value > self.best)
+
+    def _write_progress(self, epoch: int):
+        self._progress_file.write_text(json.dumps(
+            {"epoch": epoch, "stopped_early": self.stopped_early,
+             "config": self.config}))
+
+    def restore(self, model) -> int:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.config.update(output_shape=list(model.output_shape[1:]),
+                           params=int(model.count_params()))
+        if self._progress_file.exists():
+            progress = json.loads(self._progress_file.read_text())
+            if progress.get("config") != self.config:
+                raise ValueError(
+                    f"{self.directory} holds a run with config "
+                    f"{progress.get('config')}, not {self.config}; pass another "
+                    "checkpoint directory or delete it")
+            self.stopped_early = progress["stopped_early"]
+        else:
+            self._write_progress(0)
+        # optimizer slots do not exist until the first step; their values
+        # are restored when they are created
+        self._checkpoint = tf.train.Checkpoint(
+            model=model, optimizer=model.optimizer, epoch=self._epoch)
+        self._manager = tf.train.CheckpointManager(
+            self._checkpoint, self.directory / "state", max_to_keep=self.max_to_keep)
+        if self._manager.latest_checkpoint:
+            self._checkpoint.restore(self._manager.latest_checkpoint)
+        if self._best_file.exists():
+            best = json.loads(self._best_file.read_text())
+            self.best, self.best_epoch = best["value"], best["epoch"]
+        epoch = int(self._epoch.numpy())
+        if self._history_file.exists():
+            # epochs after the last checkpoint are trained again
+            self.epoch_logs = json.loads(self._history_file.read_text())[:epoch]
+        return(epoch)
+
+    def history(self) -> dict:
+        keys = [key for logs in self.epoch_logs for key in logs]
+        return({key: [logs.get(key) for logs in self.epoch_logs]
+                for key in dict.fromkeys(keys)})
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_logs = self.epoch_logs[:epoch] + \
+            [{k: float(v) for k, v in (logs or {}).items()}]
+        self._history_file.write_text(json.dumps(self.epoch_logs))
+        value = (logs or {}).get(self.monitor)
+        if value is not None and self._improved(value):
+            self.best, self.best_epoch = float(value), epoch + 1
+            self.model.save_weights(str(self.best_weights))
+            self._best_file.write_text(json.dumps(
+                {"monitor": self.monitor, "value": self.best, "epoch": epoch + 1}))
+        if value is not None and self.patience is not None and \
+                epoch + 1 - self.best_epoch >= self.patience:
+            # same rule as EarlyStopping: patience epochs without improvement
+            self.model.stop_training = True
+        self._epoch.assign(epoch + 1)
+        if (epoch + 1) % self.save_every == 0:
+            self._manager.save(checkpoint_number=epoch + 1, options=self._options)
+
+    def on_train_end(self, logs=None):
+        epoch = int(self._epoch.numpy())
+        self._manager.save(checkpoint_number=epoch, options=self._options)
+        self.stopped_early = self.stopped_early or bool(self.model.stop_training)
+        self._write_progress(epoch)
+        if hasattr(self._checkpoint, "sync"):
+            self._checkpoint.sync()
+        if self._best_file.exists():
+            self.model.load_weights(str(self.best_weights))
+
+def fit_resumable(model, train_ds, val_ds, epochs: int=100,
+                  checkpoint_dir: Path=CHECKPOINT_DIR,
+                  save_every: int=1,
+                  monitor: str="val_loss",
+                  patience: int=None,
+                  log_dir: Path=None,
+                  profile_batch=0,
+                  callbacks: list=None,
+                  verbose="auto",
+                  config: dict=None):
+    mode = "max" if "acc" in monitor or "auc" in monitor else "min"
+    checkpoint = TrainingCheckpoint(checkpoint_dir, monitor=monitor, mode=mode,
+                                    save_every=save_every, config=config,
+                                    patience=patience)
+    initial_epoch = checkpoint.restore(model)
+    if checkpoint.stopped_early:
+        # fit() runs no epochs and only restores the best weights
+        initial_epoch = epochs
+    if initial_epoch:
+        print(f"Resuming from epoch {initial_epoch} ({checkpoint_dir})")
+
+    callbacks = list(callbacks or []) + [trace_callback()]
+    if log_dir is not None:
+        # profile_batch=(start, stop) adds the TensorFlow op-level profile
+        callbacks.append(TensorBoard(log_dir=str(log_dir),
+                                     profile_batch=profile_batch))
+    # runs last: it stops early and restores the best weights
+    callbacks.append(checkpoint)
+    with TRACER.span("fit", memory=True, epochs=epochs, initial_epoch=initial_epoch):
+        history = model.fit(train_ds, epochs=epochs, initial_epoch=initial_epoch,
+                            verbose=verbose, validation_data=val_ds,
+                            callbacks=callbacks)
+    # every epoch of the run, including those before a resume
+    history.history = checkpoint.history()
+    history.epoch = list(range(len(checkpoint.epoch_logs)))
+    return(history)
+
+def train_model(kind: str="optimized", epochs: int=100, seed: int=SEED,
+                fast: bool=False, output: Path=None, verbose="auto",
+                checkpoint_dir: Path=None, save_every: int=1, log_dir: Path=None,
+                augment: bool=False, profile_batch=0, classes=VEHICLE_CLASSES):
+    if kind not in BUILDERS:
+        raise ValueError(f"kind must be one of {tuple(BUILDERS)}")
+    np.random.seed(seed)
+    tf.random.set_seed(seed)
+
+    num_classes = len(classes)
+    (X_train, y_train), (X_test, y_test) = cifar10_subset_cached(classes)
+    fit_idx, val_idx = split_indices(classes)
+    scaler = MinMaxImageScaler(per_channel=True).fit(X_train, indices=fit_idx)
+
+    train_ds = make_dataset(X_train, y_train, indices=fit_idx,
+                            shuffle=True, seed=seed, num_classes=num_classes,
+                            augment=Augmentation() if augment else None)
+    val_ds = make_dataset(X_train, y_train, indices=val_idx, num_classes=num_classes)
+    test_ds = make_dataset(X_test, y_test, num_classes=num_classes)
+
+    model = BUILDERS[kind](scaler, fast=fast, num_classes=num_classes)
+    history = fit_resumable(
+        model, train_ds, val_ds, epochs=epochs,
+        checkpoint_dir=checkpoint_dir or CHECKPOINT_DIR / kind,
+        save_every=save_every,
+        patience=5 if kind == "optimized" else None,
+        log_dir=log_dir, profile_batch=profile_batch, verbose=verbose,
+        config=run_config(kind, classes, seed, augment, fast))
+    with TRACER.span("evaluate", memory=True):
+        loss, accuracy = model.evaluate(test_ds, verbose=0)
+
+    if output is not None:
+        model.save(Path(output))
+        save_class_names(output, classes)
+    return(model, history, {"loss": float(loss), "accuracy": float(accuracy)})
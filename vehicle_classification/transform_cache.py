@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import sklearn
+
+###############################################################################
+# Fit-once Transformer Cache
+#
+# Fitted StandardScaler / PCA / NMF stages are stored as versioned joblib
+# artifacts keyed by a hash of their input data and hyperparameters, and
+# their projected features are cached next to them as .npy files that are
+# memory-mapped on load.  Keys chain: the key returned for a projection is
+# the data key of anything fitted on it.  Entries are evicted least
+# recently used first once the cache grows past max_bytes.
+###############################################################################
+ARTIFACT_DIR = Path("artifacts")
+ARTIFACT_VERSION = 1
+MAX_CACHE_BYTES = 2 << 30
+
+def _digest(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode())
+        h.update(b"\0")
+    return(h.hexdigest()[:16])
+
+def data_fingerprint(X: np.ndarray, chunk_size: int=1 << 24) -> str:
+    h = hashlib.sha256(f"{X.shape}|{X.dtype}".encode())
+    flat = np.ascontiguousarray(X).reshape(-1).view(np.uint8)
+    for start in range(0, len(flat), chunk_size):
+        h.update(flat[start:start + chunk_size])
+    return(h.hexdigest()[:16])
+
+def params_fingerprint(estimator) -> str:
+    params = json.dumps(estimator.get_params(), sort_keys=True, default=str)
+    return(_digest(type(estimator).__name__, params))
+
+class TransformCache:
+    def __init__(self, root: Path=ARTIFACT_DIR, max_bytes: int=MAX_CACHE_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _entry(self, key: str) -> Path:
+        return(self.root / key)
+
+    def _touch(self, key: str):
+        meta = self._entry(key) / "meta.json"
+        if meta.exists():
+            os.utime(meta)
+
+    def fit(self, name: str, estimator, X: np.ndarray, y: np.ndarray=None,
+            data_key: str=None):
+        data_key = data_key or data_fingerprint(X)
+        key = f"{name}-" + _digest(ARTIFACT_VERSION, sklearn.__version__,
+                                   params_fingerprint(estimator), data_key)
+        entry = self._entry(key)
+        model_path = entry / "model.joblib"
+        if model_path.exists():
+            self._touch(key)
+            return(joblib.load(model_path), key)
+
+        if y is None:
+            estimator.fit(X)
+        else:
+            estimator.fit(X, y)
+        entry.mkdir(parents=True, exist_ok=True)
+        tmp = entry / "model.joblib.tmp"
+        joblib.dump(estimator, tmp)
+        os.replace(tmp, model_path)
+        (entry / "meta.json").write_text(json.dumps({
+            "name": name,
+            "estimator": type(estimator).__name__,
+            "params": estimator.get_params(),
+            "data_key": data_key,
+            "sklearn": sklearn.__version__,
+            "version": ARTIFACT_VERSION,
+            "created": time.time()}, indent=2, default=str))
+        self.evict(keep=(key,))
+        return(estimator, key)
+
+    def cached_array(self, key: str, tag: str, compute) -> np.ndarray:
+        path = self._entry(key) / f"{tag}.npy"
+        if not path.exists():
+            arr = np.asarray(compute())
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp, path)
+            self.evict(keep=(key,))
+        self._touch(key)
+        return(np.load(path, mmap_mode="r"))
+
+    def transform(self, estimator, key: str, X: np.ndarray, data_key: str=None):
+        data_key = data_key or data_fingerprint(X)
+        Xt = self.cached_array(key, f"transform-{data_key}",
+                               lambda: estimator.transform(X))
+        return(Xt, _digest(key, data_key))
+
+    def entries(self) -> list:
+        rows = []
+        for entry in self.root.iterdir():
+            if not entry.is_dir():
+                continue
+            files = [f for f in entry.iterdir() if f.is_file()]
+            meta = entry / "meta.json"
+            last_used = meta.stat().st_mtime if meta.exists() else \
+                max((f.stat().st_mtime for f in files), default=0.0)
+            rows.append((last_used, sum(f.stat().st_size for f in files), entry))
+        return(sorted(rows))
+
+    def size(self) -> int:
+        return(sum(nbytes for _, nbytes, _ in self.entries()))
+
+    def evict(self, keep: tuple=()):
+        entries = self.entries()
+        total = sum(nbytes for _, nbytes, _ in entries)
+        for _, nbytes, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry.name in keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= nbytes
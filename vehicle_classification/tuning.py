@@ -0,0 +1,197 @@
+###############################################################################
+# Parallel, Resumable Hyperband Search
+#
+#   python -m vehicle_classification.tuning --workers 4 --directory hyperband
+#
+# The launcher starts one keras-tuner chief (it only runs the oracle) and
+# --workers trial processes that talk to it over localhost.  Each worker is
+# pinned to its own slice of cores with a matching thread count, so the
+# processes do not oversubscribe the machine.  The oracle state and every
+# finished trial live in --directory; rerunning the same command after a
+# crash or kill resumes the search instead of starting over.
+#
+# Repeated executions of a trial are pruned once they are clearly behind
+# the bracket leader (see PrunedHyperband), and every execution of every
+# trial in a worker reads from the same prepared, in-memory input pipeline.
+###############################################################################
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from .config import INPUT_SHAPE, NUM_CLASSES, SEED
+
+HBAND_DIR = Path("hyperband")
+PROJECT_NAME = "cifar10"
+HYPERBAND_MAX_EPOCHS = 30
+EXECUTION_PER_TRIAL = 5
+MIN_EXECUTIONS = 2
+PRUNE_MARGIN = 0.02
+ORACLE_IP = "127.0.0.1"
+ORACLE_PORT = 8000
+
+###############################################################################
+# Thread Pinning
+# Must run before TensorFlow executes its first op.
+###############################################################################
+def pin_threads(n_threads: int):
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(n_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(min(2, n_threads))
+
+def _available_cores() -> list:
+    if hasattr(os, "sched_getaffinity"):
+        return(sorted(os.sched_getaffinity(0)))
+    return(list(range(os.cpu_count() or 1)))
+
+def _core_slices(cores: list, n_workers: int) -> list:
+    per_worker = max(1, len(cores) // n_workers)
+    return([cores[i * per_worker:(i + 1) * per_worker] or cores
+            for i in range(n_workers)])
+
+###############################################################################
+# Tuner
+###############################################################################
+def build_tuner(directory: Path=HBAND_DIR,
+                project_name: str=PROJECT_NAME,
+                max_epochs: int=HYPERBAND_MAX_EPOCHS,
+                executions_per_trial: int=EXECUTION_PER_TRIAL,
+                objective: str="val_accuracy",
+                seed: int=SEED,
+                scaler=None,
+                min_executions: int=MIN_EXECUTIONS,
+                prune_margin: float=PRUNE_MARGIN):
+    from .hyperband import CarTruckCNN, PrunedHyperband
+
+    return(PrunedHyperband(
+        CarTruckCNN(input_shape=INPUT_SHAPE, num_classes=NUM_CLASSES,
+                    scaler=scaler),
+        max_epochs=max_epochs,
+        objective=objective,
+        seed=seed,
+        executions_per_trial=executions_per_trial,
+        directory=str(directory),
+        project_name=project_name,
+        overwrite=False,
+        min_executions=min_executions,
+        prune_margin=prune_margin))
+
+def run_search(args):
+    pin_threads(args.threads)
+
+    from .data import cifar10_subset_cached, split_indices
+    from .pipeline import make_dataset
+    from .preprocessing import MinMaxImageScaler
+
+    (X_train, y_train), _ = cifar10_subset_cached()
+    fit_idx, val_idx = split_indices()
+    scaler = MinMaxImageScaler(per_channel=True).fit(X_train, indices=fit_idx)
+
+    tuner = build_tuner(
+        directory=args.directory,
+        project_name=args.project_name,
+        max_epochs=args.max_epochs,
+        executions_per_trial=args.executions_per_trial,
+        objective=args.objective,
+        seed=args.seed,
+        scaler=scaler,
+        min_executions=args.min_executions,
+        prune_margin=args.prune_margin)
+
+    # built once per worker; cache("") keeps the uint8 elements in memory so
+    # no execution or trial re-reads the memory-mapped arrays
+    train_ds = make_dataset(X_train, y_train, indices=fit_idx,
+                            shuffle=True, seed=args.seed, cache="")
+    val_ds = make_dataset(X_train, y_train, indices=val_idx, cache="")
+    tuner.search(train_ds, validation_data=val_ds, verbose=0)
+    print(f"{os.environ.get('KERASTUNER_TUNER_ID', 'tuner')}: "
+          f"pruned {tuner.pruned_executions} executions")
+    return(tuner)
+
+###############################################################################
+# Launcher
+###############################################################################
+def _child_env(tuner_id: str, n_threads: int, port: int) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "KERASTUNER_TUNER_ID": tuner_id,
+        "KERASTUNER_ORACLE_IP": ORACLE_IP,
+        "KERASTUNER_ORACLE_PORT": str(port),
+        "OMP_NUM_THREADS": str(n_threads),
+        "TF_NUM_INTRAOP_THREADS": str(n_threads),
+        "TF_CPP_MIN_LOG_LEVEL": env.get("TF_CPP_MIN_LOG_LEVEL", "2")})
+    return(env)
+
+def _spawn(argv: list, tuner_id: str, cores: list, port: int):
+    cmd = [sys.executable, "-m", "vehicle_classification.tuning", *argv,
+           "--role", "trial", "--threads", str(len(cores))]
+    pin = None
+    if hasattr(os, "sched_setaffinity"):
+        pin = lambda: os.sched_setaffinity(0, cores)
+    return(subprocess.Popen(
+        cmd, env=_child_env(tuner_id, len(cores), port), preexec_fn=pin))
+
+def launch(args, argv: list) -> int:
+    resuming = (Path(args.directory) / args.project_name / "oracle.json").exists()
+    print(f"{'Resuming' if resuming else 'Starting'} Hyperband search in "
+          f"{Path(args.directory) / args.project_name} "
+          f"with {args.workers} workers")
+
+    # the chief only serves the oracle: give it the first core this process
+    # may use (not CPU 0, which a cpuset can exclude) and keep that core
+    # free of trials whenever every worker still gets one of its own
+    cores = _available_cores()
+    chief_cores = cores[:1]
+    if len(cores) > args.workers:
+        cores = cores[1:]
+    procs = [_spawn(argv, "chief", chief_cores, args.port)]
+    procs += [_spawn(argv, f"tuner{i}", slice_, args.port)
+              for i, slice_ in enumerate(_core_slices(cores, args.workers))]
+    try:
+        codes = [p.wait() for p in procs]
+    except KeyboardInterrupt:
+        # the tuner directory holds every completed trial; rerun to resume
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+        return(130)
+    return(max(codes))
+
+###############################################################################
+# Command Line
+###############################################################################
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Parallel, resumable Hyperband search for CarTruckCNN")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--directory", type=Path, default=HBAND_DIR)
+    parser.add_argument("--project-name", default=PROJECT_NAME)
+    parser.add_argument("--max-epochs", type=int, default=HYPERBAND_MAX_EPOCHS)
+    parser.add_argument("--executions-per-trial", type=int, default=EXECUTION_PER_TRIAL)
+    parser.add_argument("--min-executions", type=int, default=MIN_EXECUTIONS,
+                        help="executions always run before a trial can be pruned")
+    parser.add_argument("--prune-margin", type=float, default=PRUNE_MARGIN,
+                        help="minimum gap to the bracket leader before pruning")
+    parser.add_argument("--objective", default="val_accuracy",
+                        help="scored on the stored validation split")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--port", type=int, default=ORACLE_PORT)
+    parser.add_argument("--role", choices=("launcher", "trial"), default="launcher",
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1,
+                        help=argparse.SUPPRESS)
+    return(parser)
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args = build_parser().parse_args(argv)
+    if args.role == "trial":
+        run_search(args)
+        return(0)
+    return(launch(args, argv))
+
+if __name__ == "__main__":
+    sys.exit(main())